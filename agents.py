@@ -1,12 +1,29 @@
 import os
+import asyncio
+import re
 from typing import Annotated, Literal, TypedDict
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage, AIMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 
 from tools import get_current_weather, get_weather_forecast, duckduckgo_search, read_document_with_docling
+from concurrency import run_blocking
+
+# Tag on LLM calls that produce the user-facing answer; /chat/stream forwards their tokens
+ANSWER_TAG = "answer"
+# Name of the custom events used to report workflow progress to streaming clients
+PROGRESS_EVENT = "progress"
+
+async def emit_progress(message: str, **data):
+    """Report a workflow step to streaming clients (no-op when nobody is listening)."""
+    try:
+        await adispatch_custom_event(PROGRESS_EVENT, {"message": message, **data})
+    except RuntimeError:
+        # Called outside a LangGraph/LangChain run (e.g. a node invoked directly)
+        pass
 
 # LLM Configuration with Fallback
 def get_llm(temperature=0):
@@ -75,10 +92,10 @@ from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
 from datetime import datetime, timedelta
 
 
-def query_db_node(state):
+async def query_db_node(state):
     """Agent 4: NL to SQL."""
-    # Initialize SQLDatabase lazily
-    db = SQLDatabase(engine)
+    # Initialize SQLDatabase lazily (reflects the schema, so keep it off the event loop)
+    db = await run_blocking(SQLDatabase, engine)
     
     messages = state["messages"]
     last_user_message = messages[-1].content
@@ -119,7 +136,7 @@ SQL Query:"""
     
     try:
         # Get table info
-        table_info = db.get_table_info()
+        table_info = await run_blocking(db.get_table_info)
         
         # Generate query with SQLite-specific prompt
         prompt_input = {
@@ -131,7 +148,7 @@ SQL Query:"""
         formatted_prompt = sqlite_prompt.format(**prompt_input)
         print(f"🔍 SQL Prompt sent to LLM:\n{formatted_prompt}")
         
-        response = llm.invoke([HumanMessage(content=formatted_prompt)])
+        response = await llm.ainvoke([HumanMessage(content=formatted_prompt)])
         
         # Extract SQL from response
         sql_query = response.content.strip()
@@ -154,10 +171,11 @@ SQL Query:"""
         sql_query = sql_query.rstrip(';').strip()
         
         print(f"🔍 Executing SQL: {sql_query}")
+        await emit_progress("Running database query", stage="sql_query", sql=sql_query)
         
         # Execute the cleaned query
         try:
-            result = db.run(sql_query)
+            result = await run_blocking(db.run, sql_query)
         except Exception as e:
             return {"messages": [AIMessage(content=f"❌ SQL Execution Error:\nQuery: `{sql_query}`\nError: {e}")]}
         
@@ -245,7 +263,7 @@ Query: {sql_query}
 Raw Result: {result}
 
 Provide a clear, human-readable response."""
-                format_response = llm.invoke([SystemMessage(content=format_prompt)])
+                format_response = await llm.ainvoke([SystemMessage(content=format_prompt)], config={"tags": [ANSWER_TAG]})
                 response_text = format_response.content
         else:
             response_text = f"No results found.\n(Debug: Executed `{sql_query}`)"
@@ -342,8 +360,39 @@ class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
     file_path: str | None # For Agent 2
 
+def document_id_for_path(file_path: str) -> str:
+    """Vector store document_id used for an uploaded file."""
+    return os.path.basename(file_path).replace('.', '_')
+
+def split_questions(text: str, max_questions: int = 4) -> list[str]:
+    """Split a compound message ("What is X? Who approves Y?") into its questions; anything else is returned whole."""
+    questions = [part for part in re.split(r'(?<=\?)\s+', text.strip()) if len(part.split()) >= 3]
+    if len(questions) < 2:
+        return [text]
+    return questions[:max_questions]
+
+async def wait_until_searchable(job, poll_interval: float = 0.25) -> bool:
+    """
+    Wait until an ingestion job finishes or, for a streamed PDF, has written its first chunks.
+    
+    Returns:
+        True if the job is still running (only the pages indexed so far are searchable)
+    """
+    # Never cancel the wrapped future: the job is shared with /upload and other requests
+    future = asyncio.wrap_future(job.future)
+    while not future.done():
+        if (job.progress or {}).get("chunks"):
+            return True
+        await asyncio.wait({future}, timeout=poll_interval)
+    return False
+
 # --- Router ---
-def router(state) -> Literal["weather_agent", "doc_agent", "meeting_agent", "sql_agent", "__end__"]:
+async def router(state) -> Literal["weather_agent", "doc_agent", "meeting_agent", "sql_agent", "__end__"]:
+    agent = await _select_agent(state)
+    await emit_progress(f"Routed to {agent}", stage="routed", agent=agent)
+    return agent
+
+async def _select_agent(state) -> str:
     messages = state["messages"]
     last_message = messages[-1]
     
@@ -372,7 +421,7 @@ CRITICAL: "Schedule", "book", "cancel", "unschedule", "delete" → meeting_agent
 Return ONLY ONE agent name."""
     
     # We can use structured output or just string.
-    response = llm.invoke([SystemMessage(content=system), last_message])
+    response = await llm.ainvoke([SystemMessage(content=system), last_message])
     decision = response.content.strip().lower()
     
     # Priority routing (order matters!)
@@ -401,14 +450,14 @@ Return ONLY ONE agent name."""
 
 # --- Agent Nodes ---
 
-def weather_agent_node(state):
+async def weather_agent_node(state):
     llm = get_llm(temperature=0)
     tools = [get_current_weather, get_weather_forecast]
     llm_with_tools = llm.bind_tools(tools)
-    response = llm_with_tools.invoke(state["messages"])
+    response = await llm_with_tools.ainvoke(state["messages"], config={"tags": [ANSWER_TAG]})
     return {"messages": [response]}
 
-def doc_agent_node(state):
+async def doc_agent_node(state):
     """Document + Web Intelligence Agent with FORCED RAG execution."""
     llm = get_llm(temperature=0.1)
     file_path = state.get("file_path")
@@ -416,52 +465,65 @@ def doc_agent_node(state):
     # If file uploaded, FORCE tool execution instead of asking model
     if file_path:
         import os
-        from tools import ingest_document_to_vector_store, search_vector_store, duckduckgo_search
+        from tools import describe_ingest_result, search_documents_many, render_search_results, duckduckgo_search
+        from jobs import get_ingestion_queue
         
-        doc_id = os.path.basename(file_path).replace('.', '_')
+        doc_id = document_id_for_path(file_path)
         user_query = state["messages"][-1].content
         
-        # STEP 1: Force ingest (deterministic)
-        print(f"🔴 FORCING ingest_document_to_vector_store('{file_path}', '{doc_id}', is_temporary=True)")
+        # STEP 1: Ingest once - reuse (or wait on) the background job started by /upload.
+        # Large PDFs are indexed in page batches, so search as soon as the first batch is in
+        job = await run_blocking(get_ingestion_queue().submit, file_path, doc_id, is_temporary=True)
+        if not job.is_finished:
+            print(f"⏳ Waiting for ingestion job {job.job_id} ('{doc_id}')")
+            await emit_progress("Waiting for document ingestion", stage="ingest_waiting", document_id=doc_id, job_id=job.job_id)
+        still_indexing = False
         try:
-            ingest_result = ingest_document_to_vector_store.invoke({
-                "file_path": file_path, 
-                "document_id": doc_id,
-                "is_temporary": True
-            })
+            still_indexing = await wait_until_searchable(job)
+            if still_indexing:
+                progress = job.progress
+                ingest_result = f"Indexing in progress: {progress['pages_done']} of {progress['total_pages']} pages searchable"
+            else:
+                # Shield so a disconnecting client doesn't cancel the shared job
+                ingest_result = describe_ingest_result(await asyncio.shield(asyncio.wrap_future(job.future)))
             print(f"✅ Ingest result: {ingest_result}")
+            await emit_progress(ingest_result, stage="ingesting" if still_indexing else "ingested", document_id=doc_id)
         except Exception as e:
             print(f"❌ Ingest failed: {e}")
             ingest_result = f"Error: {e}"
         
-        # STEP 2: Force search (deterministic)
-        print(f"🔴 FORCING search_vector_store('{user_query}', '{doc_id}', search_type='temporary')")
+        # STEP 2: Force search (deterministic); compound questions are searched in one batch
+        queries = split_questions(user_query)
+        print(f"🔴 FORCING search_documents_many({queries}, '{doc_id}', search_type='temporary')")
         try:
-            search_results = search_vector_store.invoke({
-                "query": user_query, 
-                "document_id": doc_id, 
-                "top_k": 3,
-                "search_type": "temporary"
-            })
-            print(f"✅ Search results: {search_results[:200]}...")
-            
-            # Parse similarity score from results
-            import re
-            scores = re.findall(r'Similarity: ([\d\.]+)', search_results)
-            max_score = float(scores[0]) if scores else 0.0
-            print(f"📊 Best similarity score: {max_score}")
+            batch = await run_blocking(search_documents_many, queries, doc_id, 3, "temporary")
+            # Every question needs a confident match, so the weakest question's best hit decides
+            best_scores = [results.best_score for results in batch]
+            weakest_best_score = min(best_scores)
+            threshold = batch[0].threshold
+            confident = all(results.is_confident for results in batch)
+            hits = sum(len(results) for results in batch)
+            print(f"✅ {hits} hits, best similarity per question: {best_scores} ({batch[-1].timings_ms.get('total_ms')}ms)")
+            await emit_progress(
+                f"Weakest question's best document match {weakest_best_score:.2f}", stage="searched",
+                weakest_best_score=weakest_best_score, best_scores=best_scores, hits=hits
+            )
+            search_results = render_search_results(batch)
             
         except Exception as e:
             print(f"❌ Search failed: {e}")
             search_results = f"Error: {e}"
-            max_score = 0.0
+            weakest_best_score = 0.0
+            threshold = None
+            confident = False
         
-        # STEP 3: Decide if we need web search (< 0.7 threshold)
+        # STEP 3: Decide if we need web search (below the temporary store's threshold)
         web_results = ""
-        if max_score < 0.7:
-            print(f"⚠️ Low confidence ({max_score} < 0.7), calling web search")
+        if not confident:
+            print(f"⚠️ Low confidence (weakest question's best score {weakest_best_score} < {threshold}), calling web search")
+            await emit_progress("Web fallback triggered", stage="web_fallback", weakest_best_score=weakest_best_score)
             try:
-                web_results = duckduckgo_search.invoke({"query": user_query})
+                web_results = await run_blocking(duckduckgo_search.invoke, {"query": user_query})
                 print(f"🌐 Web search results: {web_results[:200]}...")
             except Exception as e:
                 print(f"❌ Web search failed: {e}")
@@ -470,54 +532,52 @@ def doc_agent_node(state):
         # STEP 4: Ask LLM to synthesize answer from results
         synthesis_prompt = f"""You are answering based on the following information:
 
-DOCUMENT SEARCH RESULTS (Similarity: {max_score:.2f}):
+DOCUMENT SEARCH RESULTS (lowest best similarity across questions: {weakest_best_score:.2f}):
 {search_results}
 
 {f'WEB SEARCH RESULTS (fallback):{chr(10)}{web_results}' if web_results else ''}
 
+{f'NOTE: The document is still being indexed ({ingest_result}). Say that your answer only covers the pages processed so far.' if still_indexing else ''}
+
 USER QUESTION: {user_query}
 
 Provide a clear, accurate answer based on the information above."""
         
-        response = llm.invoke([HumanMessage(content=synthesis_prompt)])
+        response = await llm.ainvoke([HumanMessage(content=synthesis_prompt)], config={"tags": [ANSWER_TAG]})
         print(f"📤 LLM Response content: {response.content[:200]}...")
         return {"messages": [response]}
     
     # No file uploaded - search persistent documents first, then web
     else:
-        from tools import search_vector_store, duckduckgo_search
+        from tools import search_documents_many, render_search_results, duckduckgo_search
         user_query = state["messages"][-1].content
         
         # Try searching all persistent documents first (empty string searches all)
-        print(f"🔍 No file uploaded, searching persistent documents for: {user_query}")
+        queries = split_questions(user_query)
+        print(f"🔍 No file uploaded, searching persistent documents for: {queries}")
         try:
-            search_results = search_vector_store.invoke({
-                "query": user_query, 
-                "document_id": "", 
-                "top_k": 3,
-                "search_type": "persistent"
-            })
-            
-            print(f"📋 Raw search results:\n{search_results}")
+            batch = await run_blocking(search_documents_many, queries, "", 3, "persistent")
+            best_scores = [results.best_score for results in batch]
+            weakest_best_score = min(best_scores)
+            hits = sum(len(results) for results in batch)
+            print(f"📊 Best persistent doc score per question: {best_scores} ({hits} hits, {batch[-1].timings_ms.get('total_ms')}ms)")
+            await emit_progress(
+                f"Weakest question's best company document match {weakest_best_score:.2f}", stage="searched",
+                weakest_best_score=weakest_best_score, best_scores=best_scores, hits=hits
+            )
             
-            # Parse similarity score
-            import re
-            scores = re.findall(r'Similarity: ([\d\.]+)', search_results)
-            max_score = float(scores[0]) if scores else 0.0
-            print(f"📊 Best persistent doc score: {max_score}")
-            
-            # If good match in persistent docs, use it
-            if max_score >= 0.5:  # Lower threshold for persistent docs
-                print(f"✅ Found relevant info in persistent documents (score: {max_score})")
+            # If every question has a good match in persistent docs, use them
+            if all(results.is_confident for results in batch):  # Persistent store's threshold
+                print(f"✅ Found relevant info in persistent documents (weakest question's best score: {weakest_best_score} >= {batch[0].threshold})")
                 synthesis_prompt = f"""Answer based on company documents:
 
 COMPANY DOCUMENTS:
-{search_results}
+{render_search_results(batch)}
 
 USER QUESTION: {user_query}
 
 Provide a clear answer based on the company documents above."""
-                response = llm.invoke([HumanMessage(content=synthesis_prompt)])
+                response = await llm.ainvoke([HumanMessage(content=synthesis_prompt)], config={"tags": [ANSWER_TAG]})
                 print(f"📤 LLM Response content: {response.content[:200]}...")
                 return {"messages": [response]}
         except Exception as e:
@@ -525,8 +585,9 @@ Provide a clear answer based on the company documents above."""
         
         # Fallback to web search if no good persistent doc match
         print(f"🌐 Using web search for: {user_query}")
+        await emit_progress("Web fallback triggered", stage="web_fallback")
         try:
-            web_results = duckduckgo_search.invoke({"query": user_query})
+            web_results = await run_blocking(duckduckgo_search.invoke, {"query": user_query})
             synthesis_prompt = f"""Answer the question using this web search information:
 
 WEB SEARCH RESULTS:
@@ -535,16 +596,16 @@ WEB SEARCH RESULTS:
 USER QUESTION: {user_query}
 
 Provide a clear answer."""
-            response = llm.invoke([HumanMessage(content=synthesis_prompt)])
+            response = await llm.ainvoke([HumanMessage(content=synthesis_prompt)], config={"tags": [ANSWER_TAG]})
             print(f"📤 LLM Response content: {response.content[:200]}...")
             return {"messages": [response]}
         except Exception as e:
             print(f"⚠️ Web search exception: {e}")
-            response = llm.invoke(state["messages"])
+            response = await llm.ainvoke(state["messages"], config={"tags": [ANSWER_TAG]})
             print(f"📤 LLM Response content: {response.content[:200]}...")
             return {"messages": [response]}
 
-def meeting_agent_node_implementation(state):
+async def meeting_agent_node_implementation(state):
     """Meeting Scheduling and Cancellation Agent with FORCED weather check."""
     llm = get_llm(temperature=0.1)
     user_query = state["messages"][-1].content
@@ -563,8 +624,9 @@ def meeting_agent_node_implementation(state):
             date_filter = "today"
         
         print(f"🗑️  FORCING cancel_meetings(date_filter='{date_filter}')")
+        await emit_progress(f"Cancelling meetings ({date_filter})", stage="cancel_meetings")
         try:
-            cancel_result = cancel_meetings.invoke({"date_filter": date_filter, "meeting_ids": ""})
+            cancel_result = await run_blocking(cancel_meetings.invoke, {"date_filter": date_filter, "meeting_ids": ""})
             print(f"✅ Cancel result: {cancel_result}")
             return {"messages": [AIMessage(content=cancel_result)]}
         except Exception as e:
@@ -595,7 +657,7 @@ Valid example: {{"title": "Team Meeting", "date": "tomorrow", "time": "14:00", "
 
 JSON:"""
     
-    parse_response = llm.invoke([HumanMessage(content=parse_prompt)])
+    parse_response = await llm.ainvoke([HumanMessage(content=parse_prompt)])
     print(f"📋 Parsed meeting request: {parse_response.content}")
     
     # Extract JSON from response
@@ -610,7 +672,7 @@ JSON:"""
             if not meeting_data:
                 print("⚠️ Empty JSON received, treating as greeting/general chat")
                 greeting_prompt = f"The user said: '{user_query}'. This was routed to the meeting agent but contains no meeting details. Please respond appropriately (e.g. return a greeting or ask for meeting details)."
-                greeting_response = llm.invoke([HumanMessage(content=greeting_prompt)])
+                greeting_response = await llm.ainvoke([HumanMessage(content=greeting_prompt)], config={"tags": [ANSWER_TAG]})
                 return {"messages": [greeting_response]}
 
             # Convert date to actual datetime
@@ -641,8 +703,9 @@ JSON:"""
             
             # STEP 1: Force weather check
             print(f"🌤️  FORCING get_weather_forecast('{city}', {days_ahead})")
+            await emit_progress(f"Checking weather in {city}", stage="weather_check", city=city)
             try:
-                weather_data = get_weather_forecast.invoke({"city": city})
+                weather_data = await run_blocking(get_weather_forecast.invoke, {"city": city})
                 
                 # Extract weather description from forecast data
                 if isinstance(weather_data, dict) and 'list' in weather_data:
@@ -669,8 +732,9 @@ JSON:"""
             
             # STEP 2: Schedule meeting (even if bad weather, just warn)
             print(f"📅 FORCING schedule_meeting('{meeting_data.get('title')}', {start_time}, {end_time})")
+            await emit_progress("Scheduling meeting", stage="schedule_meeting")
             try:
-                schedule_result = schedule_meeting.invoke({
+                schedule_result = await run_blocking(schedule_meeting.invoke, {
                     "title": meeting_data.get("title", "Meeting"),
                     "description": f"Weather: {weather_result[:100]}",
                     "start_time": start_time,
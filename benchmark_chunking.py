@@ -0,0 +1,134 @@
+"""
+Benchmark chunking strategies (markdown/token-aware vs fixed character windows).
+
+For each chunker, chunks the corpus, embeds the chunks and runs a set of
+questions with known answers. Reports chunk count and size, chunking and
+embedding (ingest) time, retrieval hit rate (an answer is a hit when it
+appears in one of the top-k chunks) and the prompt tokens those top-k
+chunks would add.
+
+Usage:
+    python benchmark_chunking.py
+    python benchmark_chunking.py --corpus persistent_docs --queries qa.tsv --top-k 3
+
+The --queries file holds one "question<TAB>expected answer text" per line.
+"""
+import argparse
+import re
+import time
+from pathlib import Path
+import numpy as np
+from chunking import CHUNKERS, build_chunker
+from document_loader import TEXT_EXTENSIONS, DOCLING_EXTENSIONS, load_document_text
+from embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_model
+
+DEFAULT_QA = [
+    ("What is the remote work policy?", "supports flexible remote work arrangements"),
+    ("Who is eligible for remote work?", "All full-time employees are eligible"),
+    ("What equipment does the company provide?", "laptop and monitor"),
+    ("How much is the home office stipend?", "$500 annual stipend"),
+    ("What are the core working hours?", "10 AM - 3 PM"),
+    ("How many hours per week are required?", "Minimum 40 hours per week"),
+    ("Is VPN access mandatory?", "VPN access is mandatory"),
+    ("How is remote performance evaluated?", "evaluated on deliverables"),
+    ("When is the daily standup?", "Daily standup at 10 AM"),
+    ("What is the Slack response time?", "within 1 hour"),
+]
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so answers match across line breaks."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def load_documents(corpus_dir: Path) -> list[str]:
+    documents = []
+    for path in sorted(corpus_dir.glob("*")):
+        if path.suffix.lower() not in TEXT_EXTENSIONS + DOCLING_EXTENSIONS:
+            continue
+        try:
+            documents.append(load_document_text(str(path)))
+        except Exception as e:
+            print(f"   ⚠️ Skipping {path.name}: {e}")
+    if not documents:
+        raise SystemExit(f"❌ No supported documents found in {corpus_dir}")
+    return documents
+
+
+def load_qa(path: Path) -> list[tuple[str, str]]:
+    pairs = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if "\t" in line:
+            question, answer = line.split("\t", 1)
+            pairs.append((question.strip(), answer.strip()))
+    return pairs
+
+
+def benchmark_chunker(name: str, model, documents: list[str], qa: list[tuple[str, str]],
+                      top_k: int, batch_size: int) -> dict:
+    """Chunk and embed the corpus with one chunker, then score retrieval."""
+    chunker = build_chunker(name, model)
+    count_tokens = build_chunker("markdown", model).count_tokens
+
+    start = time.perf_counter()
+    chunks = [chunk for document in documents for chunk in chunker.split(document)]
+    chunk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_embeddings = model.encode(chunks, batch_size=batch_size, convert_to_numpy=True,
+                                  normalize_embeddings=True, show_progress_bar=False)
+    embed_s = time.perf_counter() - start
+
+    query_embeddings = model.encode([question for question, _ in qa], convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False)
+    k = min(top_k, len(chunks))
+    top = np.argsort(-(query_embeddings @ doc_embeddings.T), axis=1)[:, :k]
+
+    normalized_chunks = [normalize_text(chunk) for chunk in chunks]
+    chunk_tokens = count_tokens(chunks)
+    hits = [
+        any(normalize_text(answer) in normalized_chunks[i] for i in indices)
+        for (_, answer), indices in zip(qa, top)
+    ]
+
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "avg_tokens": float(np.mean(chunk_tokens)),
+        "max_tokens": max(chunk_tokens),
+        "chunk_ms": chunk_s * 1000,
+        "ingest_s": chunk_s + embed_s,
+        "hit_rate": float(np.mean(hits)),
+        "context_tokens": float(np.mean([sum(chunk_tokens[i] for i in indices) for indices in top])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunking strategies")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--chunkers", nargs="+", default=list(CHUNKERS), choices=CHUNKERS)
+    parser.add_argument("--corpus", type=Path, default=Path("persistent_docs"))
+    parser.add_argument("--queries", type=Path, help="TSV of question<TAB>answer (defaults to built-in policy questions)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    documents = load_documents(args.corpus)
+    qa = load_qa(args.queries) if args.queries else DEFAULT_QA
+    model = get_embedding_model(args.model)
+
+    print(f"📊 Model: {args.model} | {len(documents)} documents ({sum(map(len, documents))} chars) | {len(qa)} questions")
+    results = [benchmark_chunker(name, model, documents, qa, args.top_k, args.batch_size) for name in args.chunkers]
+
+    print(f"\n{'chunker':<10} {'chunks':>7} {'avg tok':>8} {'max tok':>8} {'chunk ms':>9} {'ingest s':>9} "
+          f"{f'hit@{args.top_k}':>7} {'ctx tok':>8}")
+    for result in results:
+        print(f"{result['chunker']:<10} {result['chunks']:>7} {result['avg_tokens']:>8.1f} {result['max_tokens']:>8} "
+              f"{result['chunk_ms']:>9.1f} {result['ingest_s']:>9.2f} {result['hit_rate']:>7.2f} {result['context_tokens']:>8.1f}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("CHUNKING BENCHMARK")
+    print("=" * 60)
+    main()
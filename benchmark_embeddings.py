@@ -0,0 +1,147 @@
+"""
+Benchmark embedding backends (torch vs ONNX vs int8 ONNX vs OpenVINO).
+
+Reports encode throughput on a chunked corpus plus retrieval agreement with
+the torch baseline: recall@k of each backend's nearest neighbours against
+torch's, and the mean cosine between the two backends' embeddings of the
+same text (how interchangeable they are with existing collections).
+
+Usage:
+    python benchmark_embeddings.py --backends torch onnx onnx-int8
+    python benchmark_embeddings.py --corpus persistent_docs --queries queries.txt --top-k 5
+"""
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+from embeddings import DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKENDS, load_embedding_model
+
+DEFAULT_QUERIES = [
+    "What is the remote work policy?",
+    "Who is eligible for remote work?",
+    "What equipment does the company provide?",
+    "How much is the home office stipend?",
+    "What are the core working hours?",
+    "How many hours per week are required?",
+    "Is VPN access mandatory?",
+    "How is remote performance evaluated?",
+    "When is the daily standup?",
+    "What is the Slack response time?",
+]
+
+
+def load_corpus(corpus_dir: Path, chunk_size: int, chunk_overlap: int, min_chunks: int) -> tuple[list[str], list[str]]:
+    """
+    Chunk every .txt/.md file in corpus_dir.
+    
+    Returns:
+        (unique chunks for recall, corpus repeated up to min_chunks for timing)
+    """
+    chunks = []
+    step = chunk_size - chunk_overlap
+    for path in sorted(corpus_dir.glob("*")):
+        if path.suffix.lower() not in (".txt", ".md"):
+            continue
+        text = path.read_text(encoding="utf-8", errors="replace")
+        chunks.extend(c for c in (text[i:i + chunk_size] for i in range(0, len(text), step)) if c.strip())
+    if not chunks:
+        raise SystemExit(f"❌ No .txt/.md content found in {corpus_dir}")
+    timing_corpus = list(chunks)
+    while len(timing_corpus) < min_chunks:
+        timing_corpus.extend(chunks)
+    return chunks, timing_corpus[:max(min_chunks, len(chunks))]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def top_k_indices(queries: np.ndarray, docs: np.ndarray, k: int) -> np.ndarray:
+    scores = normalize(queries) @ normalize(docs).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def benchmark_backend(model_name: str, backend: str, timing_corpus: list[str], chunks: list[str],
+                      queries: list[str], batch_size: int, repeats: int) -> dict:
+    """Load one backend, time corpus encoding and embed the recall corpus and queries."""
+    load_start = time.perf_counter()
+    model = load_embedding_model(model_name, backend)
+    load_s = time.perf_counter() - load_start
+
+    # Warm-up pass so lazy initialization doesn't count against throughput
+    model.encode(timing_corpus[:batch_size], batch_size=batch_size, show_progress_bar=False)
+
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.encode(timing_corpus, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        durations.append(time.perf_counter() - start)
+    best = min(durations)
+
+    query_start = time.perf_counter()
+    for query in queries:
+        model.encode([query], convert_to_numpy=True, show_progress_bar=False)
+    single_query_ms = (time.perf_counter() - query_start) / len(queries) * 1000
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "chunks_per_s": len(timing_corpus) / best,
+        "single_query_ms": single_query_ms,
+        "doc_embeddings": model.encode(chunks, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False),
+        "query_embeddings": model.encode(queries, convert_to_numpy=True, show_progress_bar=False),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"], choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--corpus", type=Path, default=Path("persistent_docs"))
+    parser.add_argument("--queries", type=Path, help="File with one query per line (defaults to built-in policy questions)")
+    parser.add_argument("--min-chunks", type=int, default=512, help="Repeat the corpus up to this many chunks for timing")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks, timing_corpus = load_corpus(args.corpus, 500, 50, args.min_chunks)
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [line.strip() for line in args.queries.read_text(encoding="utf-8").splitlines() if line.strip()]
+    top_k = min(args.top_k, len(chunks))
+
+    backends = list(args.backends)
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # Baseline for recall and compatibility
+
+    print(f"📊 Model: {args.model} | {len(timing_corpus)} timing chunks | {len(chunks)} recall chunks | {len(queries)} queries")
+    results = {}
+    for backend in backends:
+        print(f"\n⏱️  Benchmarking {backend}...")
+        try:
+            results[backend] = benchmark_backend(args.model, backend, timing_corpus, chunks, queries, args.batch_size, args.repeats)
+        except Exception as e:
+            print(f"   ❌ {backend} unavailable: {e}")
+
+    baseline = results.get("torch")
+    if not baseline:
+        raise SystemExit("❌ torch baseline failed; cannot compare backends")
+    baseline_top = top_k_indices(baseline["query_embeddings"], baseline["doc_embeddings"], top_k)
+
+    print(f"\n{'backend':<11} {'load s':>7} {'chunks/s':>9} {'speedup':>8} {'query ms':>9} {f'recall@{top_k}':>9} {'cos vs torch':>13}")
+    for backend, result in results.items():
+        top = top_k_indices(result["query_embeddings"], result["doc_embeddings"], top_k)
+        recall = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(top, baseline_top)])
+        cosine = np.mean(np.sum(normalize(result["doc_embeddings"]) * normalize(baseline["doc_embeddings"]), axis=1))
+        print(f"{backend:<11} {result['load_s']:>7.2f} {result['chunks_per_s']:>9.1f} "
+              f"{result['chunks_per_s'] / baseline['chunks_per_s']:>7.2f}x {result['single_query_ms']:>9.2f} "
+              f"{recall:>9.3f} {cosine:>13.4f}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("EMBEDDING BACKEND BENCHMARK")
+    print("=" * 60)
+    main()
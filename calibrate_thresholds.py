@@ -0,0 +1,143 @@
+"""
+Calibrate the doc agent's relevance thresholds.
+
+Runs a labeled query set against the vector stores and sweeps score
+thresholds. A query "falls back" (the doc agent calls web search or the
+general agent) when its best hit scores below the threshold; a relevant
+query that falls back is a miss, an irrelevant one that doesn't is a false
+accept. Reports the fallback rate and both error counts per threshold,
+marks the configured one (PERSISTENT_SCORE_THRESHOLD /
+TEMPORARY_SCORE_THRESHOLD) and recommends the most accurate.
+
+Usage:
+    python calibrate_thresholds.py
+    python calibrate_thresholds.py --queries labeled.jsonl --index
+
+The --queries file holds one JSON object per line:
+    {"query": "...", "relevant": true, "store": "persistent"}
+    {"query": "...", "relevant": false, "store": "temporary", "file": "uploads/report.pdf"}
+"store" defaults to "persistent". Temporary-store queries name the "file"
+to upload (ingested once) or an already ingested "document_id"; a
+persistent-store "file" restricts the search to that persistent document.
+"""
+import argparse
+import json
+from pathlib import Path
+import numpy as np
+from vector_store import SCORE_THRESHOLDS, get_vector_store
+
+DEFAULT_QUERIES = [
+    {"query": "What is the remote work policy?", "relevant": True},
+    {"query": "Who is eligible for remote work?", "relevant": True},
+    {"query": "How much is the home office stipend?", "relevant": True},
+    {"query": "What are the core working hours?", "relevant": True},
+    {"query": "Is VPN access mandatory when working remotely?", "relevant": True},
+    {"query": "How is performance evaluated for remote employees?", "relevant": True},
+    {"query": "What equipment does the company provide for home offices?", "relevant": True},
+    {"query": "What is the weather in Paris tomorrow?", "relevant": False},
+    {"query": "Who won the last football world cup?", "relevant": False},
+    {"query": "How do I bake sourdough bread?", "relevant": False},
+    {"query": "What is the capital of Australia?", "relevant": False},
+    {"query": "Explain quantum entanglement simply", "relevant": False},
+    {"query": "What is the current price of bitcoin?", "relevant": False},
+]
+THRESHOLDS = [round(t, 2) for t in np.arange(0.30, 0.91, 0.05)]
+
+
+def load_queries(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def best_scores(queries: list[dict], top_k: int) -> dict[str, list[tuple[float, bool]]]:
+    """Best-hit score and label of every query, grouped by store."""
+    from agents import document_id_for_path
+    from ingest_persistent_docs import persistent_document_id
+    from tools import ingest_file
+
+    ingested = {}
+    by_store: dict[str, list[tuple[str, str | None, bool]]] = {}
+    for item in queries:
+        store = item.get("store", "persistent")
+        document_id = item.get("document_id")
+        if store == "temporary" and item.get("file") and not document_id:
+            file_path = item["file"]
+            if file_path not in ingested:
+                ingested[file_path] = document_id_for_path(file_path)
+                ingest_file(file_path, ingested[file_path], is_temporary=True)
+            document_id = ingested[file_path]
+        elif store == "persistent" and item.get("file") and not document_id:
+            document_id = persistent_document_id(Path(item["file"]))
+        by_store.setdefault(store, []).append((item["query"], document_id, bool(item["relevant"])))
+
+    # One batched search per store
+    scores = {}
+    for store, items in by_store.items():
+        batch = get_vector_store(store == "persistent").search_many(
+            [query for query, _, _ in items], top_k=top_k, document_ids=[document_id for _, document_id, _ in items]
+        )
+        # Exact-term matches are confident at any threshold, so they count as 1.0
+        scores[store] = [
+            (1.0 if results.exact_match else results.best_score, relevant)
+            for results, (_, _, relevant) in zip(batch, items)
+        ]
+    return scores
+
+
+def sweep(samples: list[tuple[float, bool]]) -> list[dict]:
+    """Fallback rate and errors of each candidate threshold."""
+    rows = []
+    for threshold in THRESHOLDS:
+        fallbacks = sum(score < threshold for score, _ in samples)
+        missed = sum(score < threshold for score, relevant in samples if relevant)
+        false_accepts = sum(score >= threshold for score, relevant in samples if not relevant)
+        rows.append({
+            "threshold": threshold,
+            "fallback_rate": fallbacks / len(samples),
+            "missed": missed,
+            "false_accepts": false_accepts,
+            "accuracy": 1 - (missed + false_accepts) / len(samples),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate vector store score thresholds")
+    parser.add_argument("--queries", type=Path, help="Labeled JSONL (defaults to built-in policy/off-topic questions)")
+    parser.add_argument("--index", action="store_true", help="Index persistent_docs/ before running")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.index:
+        from ingest_persistent_docs import ingest_persistent_docs
+        ingest_persistent_docs()
+
+    queries = load_queries(args.queries) if args.queries else DEFAULT_QUERIES
+    for store, samples in best_scores(queries, args.top_k).items():
+        current = SCORE_THRESHOLDS[store]
+        relevant = [score for score, label in samples if label]
+        irrelevant = [score for score, label in samples if not label]
+        print(f"\n📊 {store} store: {len(relevant)} relevant / {len(irrelevant)} irrelevant queries")
+        if relevant:
+            print(f"   relevant scores:   min {min(relevant):.3f}  median {np.median(relevant):.3f}")
+        if irrelevant:
+            print(f"   irrelevant scores: max {max(irrelevant):.3f}  median {np.median(irrelevant):.3f}")
+
+        rows = sweep(samples)
+        print(f"\n   {'threshold':>9} {'fallback':>9} {'missed':>7} {'false acc':>10} {'accuracy':>9}")
+        for row in rows:
+            marker = "  ← current" if abs(row["threshold"] - current) < 1e-9 else ""
+            print(f"   {row['threshold']:>9.2f} {row['fallback_rate']:>9.1%} {row['missed']:>7} "
+                  f"{row['false_accepts']:>10} {row['accuracy']:>9.1%}{marker}")
+
+        # Most accurate; ties go to the lowest threshold (fewest web-search fallbacks)
+        best = max(rows, key=lambda row: (row["accuracy"], -row["threshold"]))
+        env_name = f"{store.upper()}_SCORE_THRESHOLD"
+        print(f"\n   ✅ Recommended {env_name}={best['threshold']:.2f} "
+              f"(fallback {best['fallback_rate']:.1%}, accuracy {best['accuracy']:.1%}; current {current:.2f})")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SCORE THRESHOLD CALIBRATION")
+    print("=" * 60)
+    main()
@@ -0,0 +1,419 @@
+"""
+Document Chunking.
+
+Pluggable strategies for splitting document text before embedding:
+
+- "markdown" (default): follows the markdown structure Docling emits
+  (headings, paragraphs, tables, code blocks, then lines and sentences) and
+  sizes chunks in embedding-model tokens. Each chunk is prefixed with its
+  heading path so it still makes sense on its own. Runs in linear time:
+  every piece of text is tokenized a bounded number of times.
+- "character": fixed-size character windows with overlap (the original
+  splitter).
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+CHUNKERS = ("markdown", "character")
+CHUNKER = os.getenv("CHUNKER", "markdown")
+# Markdown chunker budget, in tokenizer tokens (capped at the model's max sequence length)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_TABLE_ROW_RE = re.compile(r"^\s*\|")
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\S+\s*|\s+")
+# Rough chars-per-token when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+class _Unit:
+    """A piece of a markdown block small enough to go into a chunk."""
+
+    __slots__ = ("key", "path", "kind", "text", "separator", "header", "tokens", "header_tokens")
+
+    def __init__(self, key: tuple, path: tuple, kind: str, text: str, separator: str = "\n", header: Optional[str] = None):
+        self.key = key  # Position in the document (block index, then piece indices)
+        self.path = path  # Heading path
+        self.kind = kind
+        self.text = text
+        self.separator = separator  # Joins this unit to the previous piece of the same block
+        self.header = header  # Table header rows, repeated when a table spans chunks
+        self.tokens = 0
+        self.header_tokens = 0
+
+
+class Chunker(ABC):
+    """Base class for chunking strategies."""
+
+    name = "base"
+
+    @abstractmethod
+    def split(self, text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
+        """
+        Split text into chunks.
+
+        Args:
+            text: Document text
+            chunk_size: Maximum chunk size in the chunker's unit (None = chunker default)
+            chunk_overlap: Overlap between consecutive chunks in the same unit
+
+        Returns:
+            List of non-empty chunks
+        """
+
+    @abstractmethod
+    def settings_key(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> str:
+        """
+        Identity of the chunks this chunker produces at the given sizes.
+
+        Stored with every chunk, so documents split by another strategy or
+        size are re-chunked instead of being reported as already indexed.
+        """
+
+
+class CharacterChunker(Chunker):
+    """Fixed-size character windows with overlap."""
+
+    name = "character"
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+        """
+        Initialize the chunker.
+
+        Args:
+            chunk_size: Size of each chunk in characters
+            chunk_overlap: Overlap between chunks in characters
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def settings_key(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> str:
+        chunk_overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
+        return f"{self.name}-{chunk_size or self.chunk_size}-{chunk_overlap}"
+
+    def split(self, text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
+        chunk_size = chunk_size or self.chunk_size
+        chunk_overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
+
+        chunks = []
+        start = 0
+        text_length = len(text)
+
+        while start < text_length:
+            end = start + chunk_size
+            chunk = text[start:end]
+
+            # Only add non-empty chunks
+            if chunk.strip():
+                chunks.append(chunk)
+
+            # Move start position with overlap
+            start = end - chunk_overlap
+
+            # Prevent infinite loop for very small texts
+            if start >= text_length:
+                break
+
+        return chunks
+
+
+class MarkdownChunker(Chunker):
+    """Structure-aware chunker sized in tokenizer tokens."""
+
+    name = "markdown"
+
+    def __init__(self, tokenizer=None, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        """
+        Initialize the chunker.
+
+        Args:
+            tokenizer: Hugging Face tokenizer of the embedding model
+                       (None = estimate ~4 characters per token)
+            max_tokens: Maximum tokens per chunk, heading prefix included
+            overlap_tokens: Trailing tokens of a chunk repeated at the start of
+                            the next one within the same section
+        """
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Token counts for a batch of texts (one tokenizer call)."""
+        if not texts:
+            return []
+        if self.tokenizer is None:
+            return [max(1, len(text) // _CHARS_PER_TOKEN) for text in texts]
+        encoded = self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def settings_key(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> str:
+        overlap_tokens = self.overlap_tokens if chunk_overlap is None else chunk_overlap
+        return f"{self.name}-{chunk_size or self.max_tokens}-{overlap_tokens}"
+
+    def split(self, text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
+        max_tokens = chunk_size or self.max_tokens
+        overlap_tokens = self.overlap_tokens if chunk_overlap is None else chunk_overlap
+
+        blocks = self._parse_blocks(text)
+        if not blocks:
+            return []
+
+        # Heading-path prefixes, counted once per distinct section
+        prefixes = sorted({path for path, _, _ in blocks})
+        prefix_tokens = dict(zip(prefixes, self.count_tokens([self._prefix(path) for path in prefixes])))
+
+        units = self._fit_units(blocks, prefix_tokens, max_tokens)
+        return self._pack(units, prefix_tokens, max_tokens, overlap_tokens)
+
+    # --- Parsing ---
+
+    @staticmethod
+    def _prefix(path: tuple) -> str:
+        return " > ".join(path)
+
+    def _parse_blocks(self, text: str) -> List[tuple]:
+        """
+        Single pass over the lines, grouping them into structural blocks.
+
+        Returns:
+            List of (heading path, kind, text) with kind in paragraph/table/code
+        """
+        blocks = []
+        headings: List[str] = []
+        current: List[str] = []
+        kind = None
+
+        def flush():
+            nonlocal current, kind
+            if current and "".join(current).strip():
+                blocks.append((tuple(headings), kind, "\n".join(current).strip("\n")))
+            current, kind = [], None
+
+        for line in text.splitlines():
+            if kind == "code":
+                current.append(line)
+                if _FENCE_RE.match(line):
+                    flush()
+                continue
+
+            heading = _HEADING_RE.match(line)
+            if heading:
+                flush()
+                level = len(heading.group(1))
+                del headings[level - 1:]
+                headings.extend([""] * (level - 1 - len(headings)))
+                headings.append(heading.group(2))
+                continue
+
+            if _FENCE_RE.match(line):
+                flush()
+                kind = "code"
+                current.append(line)
+                continue
+
+            line_kind = "table" if _TABLE_ROW_RE.match(line) else "paragraph"
+            if not line.strip():
+                flush()
+            elif line_kind != kind:
+                flush()
+                kind = line_kind
+                current.append(line)
+            else:
+                current.append(line)
+        flush()
+
+        # Drop placeholder levels left by skipped heading depths
+        return [(tuple(h for h in path if h), kind, body) for path, kind, body in blocks]
+
+    # --- Sizing ---
+
+    def _fit_units(self, blocks: List[tuple], prefix_tokens: dict, max_tokens: int) -> List[_Unit]:
+        """
+        Break blocks into units that each fit in a chunk.
+
+        Oversized blocks are split one level finer (table rows, lines, then
+        sentences, then token windows); only the oversized pieces are
+        re-tokenized at each level, so every character is tokenized at most
+        four times.
+
+        Returns:
+            Units in document order
+        """
+        pending = [_Unit((i,), path, kind, body) for i, (path, kind, body) in enumerate(blocks)]
+        counts = self.count_tokens([unit.text for unit in pending])
+        header_tokens = {}
+        units = []
+
+        for level in ("structure", "sentences", "tokens", None):
+            oversized = []
+            for unit, tokens in zip(pending, counts):
+                unit.tokens = tokens
+                unit.header_tokens = header_tokens.get(unit.header, 0)
+                budget = max(1, max_tokens - prefix_tokens[unit.path] - unit.header_tokens)
+                # Token windows fit by construction
+                if tokens <= budget or level is None:
+                    units.append(unit)
+                else:
+                    oversized.append((unit, budget))
+            if not oversized or level is None:
+                break
+
+            pending = []
+            for unit, budget in oversized:
+                header = unit.header
+                separator = " "
+                if level == "structure":
+                    header, pieces = self._split_structure(unit.kind, unit.text)
+                    separator = "\n"
+                elif level == "sentences":
+                    pieces = _SENTENCE_END_RE.split(unit.text)
+                else:
+                    pieces = self._split_token_windows(unit.text, budget)
+                pending.extend(
+                    _Unit(unit.key + (j,), unit.path, unit.kind, piece, separator, header)
+                    for j, piece in enumerate(pieces) if piece.strip()
+                )
+            new_headers = sorted({unit.header for unit in pending if unit.header and unit.header not in header_tokens})
+            header_tokens.update(zip(new_headers, self.count_tokens(new_headers)))
+            counts = self.count_tokens([unit.text for unit in pending])
+
+        units.sort(key=lambda unit: unit.key)
+        return units
+
+    @staticmethod
+    def _split_structure(kind: str, body: str) -> tuple[Optional[str], List[str]]:
+        """
+        Split a block along its own structure.
+
+        Returns:
+            (table header repeated in every chunk of the table, or None; pieces)
+        """
+        lines = body.split("\n")
+        if kind == "table" and len(lines) > 2 and _TABLE_SEPARATOR_RE.match(lines[1]):
+            return "\n".join(lines[:2]), lines[2:]
+        return None, lines
+
+    def _split_token_windows(self, text: str, budget: int) -> List[str]:
+        """Cut text into consecutive windows of at most budget tokens."""
+        if self.tokenizer is not None and getattr(self.tokenizer, "is_fast", False):
+            offsets = self.tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                verbose=False
+            )["offset_mapping"]
+            return [
+                text[offsets[start][0]:offsets[min(start + budget, len(offsets)) - 1][1]]
+                for start in range(0, len(offsets), budget)
+            ]
+        # No offsets: group whole words up to the estimated character budget
+        window = budget * _CHARS_PER_TOKEN
+        pieces, current, size = [], [], 0
+        for word in _WORD_RE.findall(text):
+            if current and size + len(word) > window:
+                pieces.append("".join(current))
+                current, size = [], 0
+            current.append(word)
+            size += len(word)
+        if current:
+            pieces.append("".join(current))
+        return pieces
+
+    # --- Packing ---
+
+    def _render(self, units: List[_Unit]) -> str:
+        """Join a chunk's units, keeping line/sentence breaks and table headers."""
+        parts = []
+        previous = None
+        for unit in units:
+            same_block = previous is not None and previous.key[0] == unit.key[0]
+            if same_block:
+                parts.append(unit.separator)
+            elif previous is not None:
+                parts.append("\n\n")
+            if unit.header and not (same_block and previous.header == unit.header):
+                parts.append(unit.header + "\n")
+            parts.append(unit.text)
+            previous = unit
+        return "".join(parts)
+
+    def _pack(self, units: List[_Unit], prefix_tokens: dict, max_tokens: int, overlap_tokens: int) -> List[str]:
+        """Greedily merge consecutive units of a section into chunks, with overlap."""
+        chunks = []
+        current: List[_Unit] = []
+        current_path = None
+        current_tokens = 0
+
+        def emit():
+            body = self._render(current)
+            prefix = self._prefix(current_path)
+            chunks.append(f"{prefix}\n\n{body}" if prefix else body)
+
+        def cost(unit: _Unit, previous: Optional[_Unit]) -> int:
+            # A table row only pays for its header when it starts a new run of that table
+            continues_table = previous is not None and previous.key[0] == unit.key[0] and previous.header == unit.header
+            return unit.tokens + (0 if continues_table or not unit.header else unit.header_tokens)
+
+        for unit in units:
+            budget = max_tokens - prefix_tokens[unit.path]
+            unit_cost = cost(unit, current[-1] if current else None)
+            if current and (unit.path != current_path or current_tokens + unit_cost > budget):
+                emit()
+                # Carry trailing units of the same section as overlap
+                carried = []
+                carried_tokens = 0
+                if unit.path == current_path:
+                    for previous in reversed(current):
+                        previous_cost = previous.tokens + previous.header_tokens
+                        if carried_tokens + previous_cost > overlap_tokens or carried_tokens + previous_cost + unit_cost > budget:
+                            break
+                        carried.append(previous)
+                        carried_tokens += previous_cost
+                current, current_tokens = carried[::-1], carried_tokens
+                unit_cost = cost(unit, current[-1] if current else None)
+            current_path = unit.path
+            current.append(unit)
+            current_tokens += unit_cost
+
+        if current:
+            emit()
+        return chunks
+
+
+def build_chunker(name: str = CHUNKER, model=None) -> Chunker:
+    """
+    Create a chunker by name.
+
+    Args:
+        name: "markdown" or "character"
+        model: SentenceTransformer whose tokenizer and max sequence length size
+               markdown chunks (None = character-based token estimate)
+
+    Returns:
+        Configured chunker
+    """
+    if name == "character":
+        return CharacterChunker()
+    if name != "markdown":
+        raise ValueError(f"Unknown chunker '{name}'. Expected one of {CHUNKERS}")
+
+    tokenizer = getattr(model, "tokenizer", None) if model is not None else None
+    max_tokens = CHUNK_MAX_TOKENS
+    max_seq_length = getattr(model, "max_seq_length", None) if model is not None else None
+    if max_seq_length:
+        # Leave room for the special tokens the model adds
+        max_tokens = min(max_tokens, max_seq_length - 2)
+    return MarkdownChunker(tokenizer=tokenizer, max_tokens=max_tokens, overlap_tokens=min(CHUNK_OVERLAP_TOKENS, max_tokens // 2))
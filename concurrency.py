@@ -0,0 +1,40 @@
+"""
+Bounded executor for blocking work called from async code.
+
+SentenceTransformer encoding, Docling conversion, SQLite access and the
+synchronous LangChain tools all block the calling thread. Async agent nodes
+hand that work to a shared, size-limited thread pool so the event loop keeps
+serving other requests while it runs.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Max number of blocking calls (encode, Docling, DB, HTTP tools) in flight per worker
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "8"))
+
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_WORKERS,
+    thread_name_prefix="blocking"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a synchronous callable on the bounded executor and await its result.
+
+    The caller's context variables are copied into the worker thread so
+    LangChain callbacks and tracing keep working inside the call.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_blocking_executor, call)
+
+
+def shutdown_executor():
+    """Stop accepting blocking work and wait for in-flight calls to finish."""
+    _blocking_executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,547 @@
+"""
+Document Loading with Docling.
+
+Builds Docling converters with the pipeline options used across the app and
+runs conversions either in-process, through a pool of warm converters per
+pipeline profile, or in an isolated process pool with per-file timeouts and
+memory limits (for bulk persistent-doc indexing). Parsed markdown is cached
+on disk by file hash and converter settings (see markdown_cache.py).
+
+Plain-text formats skip Docling entirely: they are read directly with
+encoding detection, since there is no layout to analyse.
+"""
+
+import os
+import signal
+import codecs
+import hashlib
+import queue
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from importlib.metadata import version, PackageNotFoundError
+from markdown_cache import get_markdown_cache
+try:
+    from docling.document_converter import DocumentConverter
+except ImportError:
+    DocumentConverter = None
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Formats read directly vs. converted by Docling (layout analysis)
+TEXT_EXTENSIONS = ['.txt', '.md']
+DOCLING_EXTENSIONS = ['.pdf', '.docx']
+# Bytes sampled for encoding detection, and chars decoded per streamed block
+_ENCODING_SAMPLE_BYTES = 64 * 1024
+_TEXT_BLOCK_CHARS = 1024 * 1024
+
+# Large PDFs are converted and ingested in page batches (bounded memory,
+# first pages searchable early)
+STREAMING_INGEST_MIN_PAGES = int(os.getenv("STREAMING_INGEST_MIN_PAGES", "20"))
+INGEST_PAGES_PER_BATCH = int(os.getenv("INGEST_PAGES_PER_BATCH", "10"))
+
+# Pipeline profiles
+PROFILE_LIGHTWEIGHT = "lightweight"  # No OCR/tables/enrichment - ingestion
+PROFILE_FULL = "full"  # Docling defaults - reading documents for the LLM
+PROFILES = (PROFILE_LIGHTWEIGHT, PROFILE_FULL)
+# Joins page batches in one markdown cache entry (Docling markdown never contains a form feed)
+_PAGE_BATCH_SEPARATOR = "\n\f\n"
+# Warm converters kept per profile (= concurrent conversions per profile)
+DOCLING_CONVERTERS_PER_PROFILE = int(os.getenv("DOCLING_CONVERTERS_PER_PROFILE", "2"))
+# Load the ingestion pipeline's models at server startup instead of on the first upload
+DOCLING_PREWARM = os.getenv("DOCLING_PREWARM", "false").lower() in ("1", "true", "yes")
+
+# Process-pool parsing limits (persistent-doc indexing)
+DOCLING_PROCESSES = int(os.getenv("DOCLING_PROCESSES", str(os.cpu_count() or 2)))
+DOCLING_PARSE_TIMEOUT_S = float(os.getenv("DOCLING_PARSE_TIMEOUT_S", "300"))
+DOCLING_PARSE_MEMORY_MB = int(os.getenv("DOCLING_PARSE_MEMORY_MB", "8192"))  # 0 disables the limit
+# Extra time the parent waits past the in-worker timeout before killing the worker
+_PARSE_TIMEOUT_GRACE_S = 15
+
+
+def build_document_converter(lightweight: bool = True):
+    """
+    Construct a Docling DocumentConverter.
+
+    Args:
+        lightweight: Disable OCR, table structure and enrichment models for
+                     faster text extraction (used for ingestion)
+    """
+    if not DocumentConverter:
+        raise RuntimeError("Docling library not installed.")
+    if not lightweight:
+        return DocumentConverter()
+
+    # Configure lightweight pipeline - no vision models, faster processing
+    try:
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import PdfPipelineOptions
+        from docling.document_converter import PdfFormatOption
+
+        pipeline_options = PdfPipelineOptions()
+        pipeline_options.do_ocr = False  # Keep OCR for text extraction
+        pipeline_options.do_table_structure = False  # Disable table detection (slow)
+        # Disable slow enrichment features
+        pipeline_options.do_picture_classification = False
+        pipeline_options.do_picture_description = False
+        pipeline_options.do_code_enrichment = False
+        pipeline_options.do_formula_enrichment = False
+        pipeline_options.generate_picture_images = False
+
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
+    except Exception as config_error:
+        # Fallback to simple converter if advanced options fail
+        print(f"⚠️ Using simple converter due to: {config_error}")
+        return DocumentConverter()
+
+
+class ConverterPool:
+    """
+    Process-wide pool of pre-configured Docling converters.
+
+    Converters are built lazily, at most `size` per profile, and reused, so
+    pipeline models load once instead of on every call. A converter is
+    checked out by one thread at a time; callers beyond `size` wait for one
+    to be returned.
+    """
+
+    def __init__(self, size: int = DOCLING_CONVERTERS_PER_PROFILE):
+        """
+        Initialize the pool.
+
+        Args:
+            size: Maximum converters per profile
+        """
+        self.size = max(1, size)
+        self._idle = {profile: queue.LifoQueue() for profile in PROFILES}
+        self._created = {profile: 0 for profile in PROFILES}
+        self._lock = threading.Lock()
+        self.conversions = {profile: 0 for profile in PROFILES}
+
+    @contextmanager
+    def acquire(self, profile: str = PROFILE_LIGHTWEIGHT):
+        """
+        Check out a warm converter for a profile.
+
+        Args:
+            profile: PROFILE_LIGHTWEIGHT or PROFILE_FULL
+        """
+        if profile not in self._idle:
+            raise ValueError(f"Unknown converter profile '{profile}'. Expected one of {PROFILES}")
+
+        idle = self._idle[profile]
+        try:
+            converter = idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created[profile] < self.size
+                if create:
+                    self._created[profile] += 1
+            if create:
+                try:
+                    converter = build_document_converter(lightweight=profile == PROFILE_LIGHTWEIGHT)
+                except Exception:
+                    with self._lock:
+                        self._created[profile] -= 1
+                    raise
+            else:
+                converter = idle.get()
+
+        try:
+            yield converter
+        finally:
+            idle.put(converter)
+
+    def convert_to_markdown(
+        self,
+        file_path: str,
+        profile: str = PROFILE_LIGHTWEIGHT,
+        page_range: Optional[tuple[int, int]] = None
+    ) -> str:
+        """
+        Convert a document to markdown with a pooled converter.
+
+        Args:
+            file_path: Path to the document
+            profile: Pipeline profile to use
+            page_range: Optional 1-based inclusive (first, last) pages to convert
+
+        Returns:
+            Markdown text
+        """
+        with self.acquire(profile) as converter:
+            if page_range:
+                result = converter.convert(file_path, page_range=page_range)
+            else:
+                result = converter.convert(file_path)
+        with self._lock:
+            self.conversions[profile] += 1
+        return result.document.export_to_markdown()
+
+    def warm_up(self, profiles=(PROFILE_LIGHTWEIGHT,)):
+        """Build one converter per profile and load its PDF pipeline models up front."""
+        for profile in profiles:
+            with self.acquire(profile) as converter:
+                try:
+                    from docling.datamodel.base_models import InputFormat
+                    converter.initialize_pipeline(InputFormat.PDF)
+                except Exception as e:
+                    print(f"⚠️ Could not pre-load {profile} Docling pipeline: {e}")
+
+    def get_stats(self) -> dict:
+        """Converters built and conversions run per profile."""
+        with self._lock:
+            return {
+                profile: {
+                    "converters": self._created[profile],
+                    "idle": self._idle[profile].qsize(),
+                    "conversions": self.conversions[profile]
+                }
+                for profile in PROFILES
+            }
+
+
+# Global singleton instance
+_converter_pool: Optional[ConverterPool] = None
+_converter_pool_lock = threading.Lock()
+
+
+def get_converter_pool() -> ConverterPool:
+    """Get the process-wide converter pool."""
+    global _converter_pool
+
+    if _converter_pool is None:
+        with _converter_pool_lock:
+            if _converter_pool is None:
+                _converter_pool = ConverterPool()
+    return _converter_pool
+
+
+def converter_settings_key(profile: str) -> str:
+    """Short identity of a profile's converter output, used in markdown cache keys."""
+    try:
+        docling_version = version("docling")
+    except PackageNotFoundError:
+        docling_version = "unknown"
+    return hashlib.sha256(f"{profile}\0{docling_version}".encode("utf-8")).hexdigest()[:12]
+
+
+def convert_to_markdown(file_path: str, lightweight: bool = True, content_hash: Optional[str] = None) -> str:
+    """
+    Convert a document to markdown using a warm pooled converter.
+
+    Results are served from the markdown cache when the same bytes were
+    already parsed with the same settings.
+
+    Args:
+        file_path: Path to the document
+        lightweight: Use the fast ingestion pipeline instead of Docling defaults
+        content_hash: SHA-256 of the file, if the caller already computed it
+
+    Returns:
+        Markdown text
+    """
+    profile = PROFILE_LIGHTWEIGHT if lightweight else PROFILE_FULL
+    cache = get_markdown_cache()
+    if cache:
+        if content_hash is None:
+            from vector_store import compute_file_hash
+            content_hash = compute_file_hash(file_path)
+        settings_key = converter_settings_key(profile)
+        cached = cache.get(content_hash, settings_key)
+        if cached is not None:
+            return cached
+
+    if not DocumentConverter:
+        raise RuntimeError("Docling library not installed.")
+    markdown = get_converter_pool().convert_to_markdown(file_path, profile)
+
+    if cache:
+        cache.put(content_hash, settings_key, markdown)
+    return markdown
+
+
+# --- Plain-text fast path ---
+
+def is_plain_text(file_path: str) -> bool:
+    """True for formats that are read directly instead of converted by Docling."""
+    return os.path.splitext(str(file_path))[1].lower() in TEXT_EXTENSIONS
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Guess the text encoding of a file from a sample of its leading bytes.
+
+    Args:
+        sample: Leading bytes of the file
+
+    Returns:
+        Codec name usable with open()/bytes.decode()
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # Incremental decode so a multi-byte char cut off at the sample end is fine
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    if from_bytes:
+        match = from_bytes(sample).best()
+        if match:
+            return match.encoding
+    return "latin-1"
+
+
+def decode_text(raw: bytes) -> str:
+    """Decode raw file bytes with the detected encoding."""
+    return raw.decode(detect_encoding(raw[:_ENCODING_SAMPLE_BYTES]), errors="replace")
+
+
+def iter_text_file(file_path: str, block_chars: int = _TEXT_BLOCK_CHARS):
+    """
+    Stream a text file as decoded blocks with the detected encoding.
+
+    Args:
+        file_path: Path to the text file
+        block_chars: Characters per yielded block
+    """
+    with open(file_path, "rb") as f:
+        encoding = detect_encoding(f.read(_ENCODING_SAMPLE_BYTES))
+    with open(file_path, "r", encoding=encoding, errors="replace", newline="") as f:
+        while block := f.read(block_chars):
+            yield block
+
+
+def read_text_file(file_path: str) -> str:
+    """Read a whole text file with the detected encoding."""
+    return "".join(iter_text_file(file_path))
+
+
+def load_document_text(file_path: str, lightweight: bool = True, content_hash: Optional[str] = None) -> str:
+    """
+    Extract a document's text, dispatching on format.
+
+    Plain text and markdown are read directly; everything else goes through
+    a pooled Docling converter (and the markdown cache).
+
+    Args:
+        file_path: Path to the document
+        lightweight: Use the fast ingestion pipeline for Docling formats
+        content_hash: SHA-256 of the file, if the caller already computed it
+
+    Returns:
+        Document text (markdown for Docling formats)
+    """
+    if is_plain_text(file_path):
+        return read_text_file(file_path)
+    return convert_to_markdown(file_path, lightweight=lightweight, content_hash=content_hash)
+
+
+def count_pdf_pages(file_path: str) -> Optional[int]:
+    """Page count of a PDF, or None if it isn't a readable PDF (or pypdfium2 is missing)."""
+    if not pypdfium2 or os.path.splitext(str(file_path))[1].lower() != ".pdf":
+        return None
+    try:
+        pdf = pypdfium2.PdfDocument(str(file_path))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception:
+        return None
+
+
+def iter_pdf_page_batches(
+    file_path: str,
+    total_pages: int,
+    pages_per_batch: int = INGEST_PAGES_PER_BATCH,
+    lightweight: bool = True,
+    content_hash: Optional[str] = None
+):
+    """
+    Convert a PDF a few pages at a time, yielding each batch's markdown.
+
+    A converter is checked out per batch, so a long document doesn't hold
+    one while the caller embeds and writes the previous batch. Once every
+    batch has been consumed the batches are stored in the markdown cache,
+    so re-ingesting the same file (e.g. after temporary-store eviction)
+    replays them without parsing.
+
+    Args:
+        file_path: Path to the PDF
+        total_pages: Number of pages in the PDF
+        pages_per_batch: Pages converted per yielded batch
+        lightweight: Use the fast ingestion pipeline
+        content_hash: SHA-256 of the file, if the caller already computed it
+    """
+    profile = PROFILE_LIGHTWEIGHT if lightweight else PROFILE_FULL
+    step = max(1, pages_per_batch)
+    cache = get_markdown_cache()
+    if cache:
+        if content_hash is None:
+            from vector_store import compute_file_hash
+            content_hash = compute_file_hash(file_path)
+        # Batch boundaries are part of the entry, so replays chunk exactly like the first run
+        settings_key = f"{converter_settings_key(profile)}-p{step}"
+        cached = cache.get(content_hash, settings_key)
+        if cached is not None:
+            yield from cached.split(_PAGE_BATCH_SEPARATOR)
+            return
+
+    if not DocumentConverter:
+        raise RuntimeError("Docling library not installed.")
+    pool = get_converter_pool()
+    batches = []
+    for first in range(1, total_pages + 1, step):
+        last = min(first + step - 1, total_pages)
+        markdown = pool.convert_to_markdown(file_path, profile, page_range=(first, last))
+        if cache:
+            batches.append(markdown)
+        yield markdown
+
+    if cache:
+        cache.put(content_hash, settings_key, _PAGE_BATCH_SEPARATOR.join(batches))
+
+
+# --- Process pool workers ---
+
+def _init_parse_worker(memory_limit_mb: int):
+    """Worker initializer: cap the address space so one huge file can't exhaust RAM."""
+    if resource and memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _on_parse_timeout(signum, frame):
+    raise TimeoutError("Document parsing timed out")
+
+
+def _parse_in_worker(file_path: str, timeout_s: float, content_hash: Optional[str]) -> str:
+    """Worker task: convert one file to markdown, aborting after timeout_s."""
+    use_alarm = hasattr(signal, "SIGALRM") and timeout_s > 0
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_parse_timeout)
+        signal.alarm(max(1, int(timeout_s)))
+    try:
+        # The worker's own converter pool keeps its converter warm between files
+        return convert_to_markdown(file_path, lightweight=True, content_hash=content_hash)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+class DoclingProcessPool:
+    """
+    Converts documents in separate processes with per-file limits.
+
+    Each worker keeps a warm converter. A file that exceeds its timeout or
+    memory limit fails on its own; if a worker has to be killed the pool is
+    rebuilt and files that were caught up in the crash are retried once.
+    Safe to call parse() from many threads.
+    """
+
+    def __init__(
+        self,
+        processes: int = DOCLING_PROCESSES,
+        timeout_s: float = DOCLING_PARSE_TIMEOUT_S,
+        memory_limit_mb: int = DOCLING_PARSE_MEMORY_MB
+    ):
+        """
+        Initialize the pool (workers start on first use).
+
+        Args:
+            processes: Number of parser processes
+            timeout_s: Per-file conversion timeout
+            memory_limit_mb: Per-process address-space limit (0 = unlimited)
+        """
+        self.processes = max(1, processes)
+        self.timeout_s = timeout_s
+        self.memory_limit_mb = memory_limit_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Only submit as many files as there are workers, so a file's timeout
+        # starts when it actually starts parsing rather than when it was queued
+        self._slots = threading.BoundedSemaphore(self.processes)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    # spawn: the parent runs threads, which fork does not handle safely
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_parse_worker,
+                    initargs=(self.memory_limit_mb,)
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Kill a pool's workers and make the next parse start a fresh pool."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        kill_workers = getattr(executor, "kill_workers", None)  # Python 3.14+
+        if kill_workers:
+            kill_workers()
+        else:
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def parse(self, file_path: str, content_hash: Optional[str] = None, _retry: bool = True) -> str:
+        """
+        Convert a document to markdown in a worker process.
+
+        Args:
+            file_path: Path to the document
+            content_hash: SHA-256 of the file, for the markdown cache
+
+        Returns:
+            Markdown text
+
+        Raises:
+            TimeoutError: Conversion exceeded the per-file timeout
+            RuntimeError: The worker crashed (e.g. hit the memory limit)
+        """
+        with self._slots:
+            executor = self._get_executor()
+            future = executor.submit(_parse_in_worker, str(file_path), self.timeout_s, content_hash)
+            try:
+                return future.result(timeout=self.timeout_s + _PARSE_TIMEOUT_GRACE_S)
+            except FuturesTimeout:
+                # Stuck in native code where the in-worker alarm can't interrupt it
+                self._discard(executor)
+                raise TimeoutError(f"Parsing {file_path} exceeded {self.timeout_s:.0f}s; worker killed")
+            except BrokenProcessPool:
+                self._discard(executor)
+                if not _retry:
+                    raise RuntimeError(f"Parser process crashed on {file_path} (memory limit {self.memory_limit_mb}MB?)")
+        # Another file may have taken the pool down - retry once in a fresh pool
+        return self.parse(file_path, content_hash, _retry=False)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
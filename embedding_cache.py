@@ -0,0 +1,171 @@
+"""
+Persistent Embedding Cache.
+
+SQLite-backed store of chunk embeddings keyed by model identity plus the hash
+of the chunk text, so re-ingesting an unchanged (or mostly unchanged)
+document only embeds the chunks whose text actually changed. The cache is
+bounded by entry count and evicts the least recently used entries.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"))
+# ~200k bge-small vectors is roughly 300MB on disk
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# When over the limit, evict down to this fraction of max entries
+_EVICT_TO_FRACTION = 0.9
+# SQLite caps bound parameters per statement; stay well under it
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """On-disk cache of text embeddings with LRU eviction."""
+
+    def __init__(self, path: Path = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum cached embeddings before LRU eviction
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        """Cache key for a text under a specific model/backend."""
+        return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_id: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model_id: Identity of the model/backend that produced the embeddings
+            texts: Texts to look up
+
+        Returns:
+            Mapping of text index to embedding for the texts that were cached
+        """
+        keys = [self.make_key(model_id, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return {i: found[key] for i, key in enumerate(keys) if key in found}
+
+    def put_many(self, model_id: str, texts: List[str], embeddings: np.ndarray):
+        """
+        Store embeddings, evicting least recently used entries if over capacity.
+
+        Args:
+            model_id: Identity of the model/backend that produced the embeddings
+            texts: Texts that were embedded
+            embeddings: Array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (self.make_key(model_id, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._evict_if_needed()
+
+    def _evict_if_needed(self):
+        """Drop least recently used entries beyond max_entries (caller holds the lock)."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * _EVICT_TO_FRACTION)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        self.evictions += excess
+
+    def get_stats(self) -> dict:
+        """Entry count and hit/miss counters."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.path),
+                "entries": count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+                "evictions": self.evictions
+            }
+
+
+# Global singleton instance
+_embedding_cache_instance: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide embedding cache, or None if disabled."""
+    global _embedding_cache_instance
+
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _embedding_cache_instance is None:
+        with _embedding_cache_lock:
+            if _embedding_cache_instance is None:
+                _embedding_cache_instance = EmbeddingCache()
+    return _embedding_cache_instance
@@ -0,0 +1,308 @@
+"""
+Shared Embedding Model Provider and Micro-Batching Service.
+
+Loads each SentenceTransformer once per process so every VectorStoreManager
+(persistent and temporary) encodes with the same in-memory model, and
+coalesces concurrent encode requests (queries and ingest chunks) into
+micro-batches so the model runs fewer, larger forward passes.
+
+The inference backend is selected with EMBEDDING_BACKEND:
+    torch      - PyTorch fp32 (default)
+    onnx       - ONNX Runtime fp32
+    onnx-int8  - ONNX Runtime with dynamic int8 quantization (exported once, cached on disk)
+    openvino   - OpenVINO
+All backends run the same model weights, tokenizer and pooling, so their
+embeddings live in the same space as existing collections. The ONNX and
+OpenVINO backends need `pip install "optimum[onnxruntime]"` / `"optimum[openvino]"`.
+"""
+
+import os
+import queue
+import itertools
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+# Inference backend: torch | onnx | onnx-int8 | openvino
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8", "openvino")
+# Optional explicit ONNX/OpenVINO file inside the model repo (e.g. "onnx/model_O3.onnx")
+EMBEDDING_MODEL_FILE = os.getenv("EMBEDDING_MODEL_FILE") or None
+# Quantization target for onnx-int8: avx2 (portable), avx512, avx512_vnni or arm64
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "avx2")
+# Where exported/quantized models are kept between runs
+EMBEDDING_MODEL_CACHE_DIR = Path(os.getenv("EMBEDDING_MODEL_CACHE_DIR", ".cache/embedding_models"))
+
+# Micro-batching: flush when this many texts are queued or the oldest request waited this long
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+
+# Request priorities (lower runs first): interactive queries jump ahead of bulk ingest
+QUERY_PRIORITY = 0
+DOCUMENT_PRIORITY = 1
+
+# Upper bounds of the batch-size histogram buckets
+_BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_models: Dict[tuple, SentenceTransformer] = {}
+_models_lock = threading.Lock()
+
+
+def _load_quantized_onnx_model(model_name: str) -> SentenceTransformer:
+    """Load the int8 ONNX export of a model, exporting and quantizing it on first use."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+    
+    local_dir = EMBEDDING_MODEL_CACHE_DIR / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{EMBEDDING_QUANTIZATION}.onnx"
+    
+    if not (local_dir / file_name).exists():
+        print(f"⚙️ Exporting int8 ONNX model for {model_name} ({EMBEDDING_QUANTIZATION}) to {local_dir}")
+        fp32_model = SentenceTransformer(model_name, backend="onnx")
+        fp32_model.save(str(local_dir))
+        export_dynamic_quantized_onnx_model(fp32_model, EMBEDDING_QUANTIZATION, str(local_dir))
+    
+    return SentenceTransformer(str(local_dir), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_embedding_model(model_name: str, backend: str) -> SentenceTransformer:
+    """Construct a new (uncached) SentenceTransformer on the requested backend."""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx-int8" and not EMBEDDING_MODEL_FILE:
+        return _load_quantized_onnx_model(model_name)
+    
+    model_kwargs = {"file_name": EMBEDDING_MODEL_FILE} if EMBEDDING_MODEL_FILE else None
+    st_backend = "openvino" if backend == "openvino" else "onnx"
+    return SentenceTransformer(model_name, backend=st_backend, model_kwargs=model_kwargs)
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND) -> SentenceTransformer:
+    """
+    Get the process-wide SentenceTransformer for a model name and backend.
+    
+    Thread-safe: concurrent first calls load the model exactly once.
+    
+    Args:
+        model_name: Sentence transformer model to load
+        backend: Inference backend (see EMBEDDING_BACKENDS)
+    """
+    key = (model_name, backend)
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                print(f"🧠 Loading embedding model: {model_name} ({backend})")
+                model = load_embedding_model(model_name, backend)
+                _models[key] = model
+    return model
+
+
+class _EncodeRequest:
+    """A slice of texts waiting to be encoded."""
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingService:
+    """
+    Encodes texts with a shared model, coalescing concurrent requests.
+    
+    Callers block in encode() while a single worker thread drains the queue,
+    packing requests into batches of up to max_batch_size texts and waiting
+    at most max_wait_ms for a batch to fill.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        backend: str = EMBEDDING_BACKEND
+    ):
+        """
+        Initialize the embedding service.
+        
+        Args:
+            model_name: Sentence transformer model for embeddings
+            max_batch_size: Maximum texts per forward pass
+            max_wait_ms: Maximum time to hold a partial batch waiting for more requests
+            backend: Inference backend (see EMBEDDING_BACKENDS)
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.model = get_embedding_model(model_name, backend)
+        # Identity of the vectors this service produces (keys the persistent embedding cache)
+        self.model_id = f"{model_name}@{backend}"
+        if backend == "onnx-int8":
+            self.model_id += f"-{EMBEDDING_MODEL_FILE or EMBEDDING_QUANTIZATION}"
+        elif EMBEDDING_MODEL_FILE:
+            self.model_id += f"-{EMBEDDING_MODEL_FILE}"
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._encode_seconds = 0.0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._batch_histogram = {bound: 0 for bound in _BATCH_SIZE_BUCKETS}
+        self._batch_histogram_overflow = 0
+        
+        self._worker = threading.Thread(target=self._run, name=f"embed-{model_name}", daemon=True)
+        self._worker.start()
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension of the underlying model."""
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], priority: int = DOCUMENT_PRIORITY) -> np.ndarray:
+        """
+        Encode texts, sharing forward passes with concurrent callers.
+        
+        Large inputs are split into max_batch_size slices so queries queued
+        behind a bulk ingest can be served between slices.
+        
+        Args:
+            texts: Texts to encode
+            priority: QUERY_PRIORITY or DOCUMENT_PRIORITY (lower runs first)
+            
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        
+        requests = []
+        for start in range(0, len(texts), self.max_batch_size):
+            request = _EncodeRequest(texts[start:start + self.max_batch_size])
+            self._queue.put((priority, next(self._sequence), request))
+            requests.append(request)
+        
+        return np.vstack([request.future.result() for request in requests])
+
+    def _run(self):
+        """Worker loop: collect a micro-batch, encode it, resolve the futures."""
+        while True:
+            _, _, first = self._queue.get()
+            pending = [first]
+            batch_size = len(first.texts)
+            deadline = time.perf_counter() + self.max_wait
+            
+            while batch_size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                _, _, request = item
+                if batch_size + len(request.texts) > self.max_batch_size:
+                    # Doesn't fit - put it back for the next batch
+                    self._queue.put(item)
+                    break
+                pending.append(request)
+                batch_size += len(request.texts)
+            
+            self._encode_batch(pending)
+
+    def _encode_batch(self, pending: List[_EncodeRequest]):
+        """Encode one micro-batch and hand each caller its rows."""
+        started = time.perf_counter()
+        texts = [text for request in pending for text in request.texts]
+        try:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.max_batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        except Exception as e:
+            for request in pending:
+                request.future.set_exception(e)
+            return
+        
+        offset = 0
+        for request in pending:
+            request.future.set_result(embeddings[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+        
+        self._record_batch(pending, len(texts), started, time.perf_counter() - started)
+
+    def _record_batch(self, pending: List[_EncodeRequest], batch_size: int, started: float, encode_seconds: float):
+        """Update batching metrics."""
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(pending)
+            self._texts += batch_size
+            self._encode_seconds += encode_seconds
+            for request in pending:
+                wait = started - request.enqueued_at
+                self._queue_wait_total += wait
+                self._queue_wait_max = max(self._queue_wait_max, wait)
+            for bound in _BATCH_SIZE_BUCKETS:
+                if batch_size <= bound:
+                    self._batch_histogram[bound] += 1
+                    break
+            else:
+                self._batch_histogram_overflow += 1
+
+    def get_stats(self) -> dict:
+        """Batch size and queue latency metrics."""
+        with self._stats_lock:
+            histogram = {f"<={bound}": count for bound, count in self._batch_histogram.items()}
+            histogram[f">{_BATCH_SIZE_BUCKETS[-1]}"] = self._batch_histogram_overflow
+            return {
+                "model": self.model_name,
+                "backend": self.backend,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queued_requests": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0,
+                "batch_size_histogram": histogram,
+                "avg_queue_wait_ms": round(self._queue_wait_total / self._requests * 1000, 3) if self._requests else 0,
+                "max_queue_wait_ms": round(self._queue_wait_max * 1000, 3),
+                "avg_encode_ms": round(self._encode_seconds / self._batches * 1000, 3) if self._batches else 0
+            }
+
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: str = DEFAULT_EMBEDDING_MODEL) -> EmbeddingService:
+    """Get the process-wide micro-batching service for a model name."""
+    service = _services.get(model_name)
+    if service is None:
+        with _services_lock:
+            service = _services.get(model_name)
+            if service is None:
+                service = _services[model_name] = EmbeddingService(model_name)
+    return service
+
+
+def get_embedding_stats() -> Dict[str, dict]:
+    """Metrics for every embedding service started in this process."""
+    with _services_lock:
+        services = list(_services.values())
+    return {service.model_name: service.get_stats() for service in services}
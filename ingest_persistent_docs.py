@@ -1,61 +1,225 @@
 """
 Ingest persistent documents into vector store.
 Run this to make company policies searchable.
+
+Indexing is incremental: a manifest (path, size, mtime, content hash,
+chunker settings, chunk ids) records what is already indexed, so reruns only
+process new or changed files (or every file, after the chunker changes) and purge the vectors of files that were removed. Changed files are
+read and ingested in parallel; their embeddings share micro-batches.
+
+PDF and DOCX files are converted by Docling in a process pool (one warm
+converter per process, per-file timeout and memory limit), so large corpora
+use every core and one pathological file fails alone instead of stalling
+the run.
 """
+import os
+import json
+import threading
 from pathlib import Path
-from vector_store import get_vector_store
+from concurrent.futures import ThreadPoolExecutor
+from vector_store import get_vector_store, compute_content_hash
+from document_loader import DoclingProcessPool, TEXT_EXTENSIONS, DOCLING_EXTENSIONS, decode_text
+
+PERSISTENT_DIR = Path("persistent_docs")
+# Manifest lives next to the vectors it describes
+MANIFEST_PATH = Path(os.getenv("PERSISTENT_MANIFEST_PATH", "chroma_db/persistent_manifest.json"))
+# Files read and ingested concurrently
+PERSISTENT_INDEX_WORKERS = int(os.getenv("PERSISTENT_INDEX_WORKERS", str(min(8, os.cpu_count() or 4))))
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + DOCLING_EXTENSIONS
+MANIFEST_VERSION = 1
 
-def ingest_persistent_docs():
-    """Ingest all documents from persistent_docs/ into vector store."""
-    persistent_dir = Path("persistent_docs")
+# Serializes index runs (CLI, startup, watcher) within a process
+_index_lock = threading.Lock()
+
+
+def persistent_document_id(file_path: Path) -> str:
+    """
+    Vector store document_id for a persistent document.
     
-    if not persistent_dir.exists():
-        print("❌ persistent_docs/ directory not found")
-        return
+    Built from the full file name, like uploads' ids, so policy.txt and
+    policy.md are separate documents (policy_txt, policy_md).
+    """
+    return file_path.name.replace('.', '_')
+
+
+def load_manifest(manifest_path: Path = MANIFEST_PATH) -> dict:
+    """Load the index manifest, or an empty one if missing or unreadable."""
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(manifest: dict, manifest_path: Path = MANIFEST_PATH):
+    """Write the manifest atomically."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = manifest_path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(temp_path, manifest_path)
+
+
+def _file_signature(file_path: Path) -> dict:
+    stat = file_path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _index_file(vector_store, file_path: Path, previous: dict | None, parser: DoclingProcessPool) -> tuple[str, dict]:
+    """
+    Ingest one changed file.
+    
+    Returns:
+        (status, manifest entry) where status is "added", "updated" or "unchanged"
+    """
+    signature = _file_signature(file_path)
     
-    vector_store = get_vector_store()
+    # Read file content (hash the raw bytes, matching upload-time ingestion)
+    raw = file_path.read_bytes()
+    content_hash = compute_content_hash(raw)
+    doc_id = persistent_document_id(file_path)
     
-    # Find all supported files
-    supported_extensions = ['.txt', '.md']
-    files = []
-    for ext in supported_extensions:
-        files.extend(persistent_dir.glob(f'*{ext}'))
+    if vector_store.is_indexed(doc_id, content_hash):
+        # Touched but identical (or indexed by an upload job) - just record it
+        status = "unchanged"
+    else:
+        if file_path.suffix.lower() in DOCLING_EXTENSIONS:
+            document_text = parser.parse(str(file_path), content_hash)
+        else:
+            document_text = decode_text(raw)
+        
+        vector_store.ingest_document(
+            document_text=document_text,
+            document_id=doc_id,
+            metadata={
+                "file_path": str(file_path.absolute()),
+                "filename": file_path.name,
+                "storage_type": "persistent"
+            },
+            content_hash=content_hash
+        )
+        status = "updated" if previous else "added"
     
-    if not files:
-        print("📂 No text files found in persistent_docs/")
-        return
+    # Entries written before ids included the extension point at the old id
+    if previous and previous.get("document_id") not in (None, doc_id):
+        vector_store.delete_document(previous["document_id"])
     
-    print(f"\n📚 Found {len(files)} document(s) to ingest:")
+    return status, {
+        **signature,
+        "content_hash": content_hash,
+        "document_id": doc_id,
+        "chunker": vector_store.chunker_key,
+        "chunk_ids": vector_store.get_chunk_ids(doc_id)
+    }
+
+
+def ingest_persistent_docs(
+    persistent_dir: Path = PERSISTENT_DIR,
+    manifest_path: Path = MANIFEST_PATH,
+    workers: int = PERSISTENT_INDEX_WORKERS,
+    parser: DoclingProcessPool | None = None
+) -> dict:
+    """
+    Incrementally index persistent_docs/ into the persistent vector store.
+    
+    Args:
+        persistent_dir: Directory of persistent documents
+        manifest_path: Index manifest location
+        workers: Number of files processed in parallel
+        parser: Docling process pool to reuse across runs (the watcher keeps one);
+                by default a pool is created for this run and shut down after it
+        
+    Returns:
+        Summary with the documents added, updated, unchanged, removed and failed
+    """
+    summary = {"added": [], "updated": [], "unchanged": [], "removed": [], "failed": []}
+    
+    if not persistent_dir.exists():
+        print("❌ persistent_docs/ directory not found")
+        return summary
     
-    for file_path in files:
-        try:
-            print(f"\n📄 Processing: {file_path.name}")
-            
-            # Read file content
-            content = file_path.read_text(encoding='utf-8')
-            
-            # Use filename without extension as document_id
-            doc_id = file_path.stem
-            
-            # Ingest into vector store
-            num_chunks = vector_store.ingest_document(
-                document_text=content,
-                document_id=doc_id,
-                metadata={
-                    "file_path": str(file_path.absolute()),
-                    "filename": file_path.name,
-                    "storage_type": "persistent"
-                },
-                chunk_size=500,
-                chunk_overlap=50
-            )
-            
-            print(f"   ✅ Ingested '{doc_id}' - Created {num_chunks} chunks")
-            
-        except Exception as e:
-            print(f"   ❌ Failed to ingest {file_path.name}: {e}")
+    with _index_lock:
+        vector_store = get_vector_store()
+        manifest = load_manifest(manifest_path)
+        indexed = manifest["files"]
+        
+        # Find all supported files
+        files = {
+            path.relative_to(persistent_dir).as_posix(): path
+            for path in sorted(persistent_dir.iterdir())
+            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+        }
+        
+        # Names that map to the same document_id (e.g. "a.b.txt" and "a_b.txt") would
+        # overwrite each other's vectors: index the first, reject the others
+        owners = {}
+        for key, path in list(files.items()):
+            doc_id = persistent_document_id(path)
+            if doc_id in owners:
+                del files[key]
+                # Its vectors (if any) now belong to the owner, which re-indexes them
+                indexed.pop(key, None)
+                summary["failed"].append(doc_id)
+                print(f"   ❌ Skipping {key}: document_id '{doc_id}' is already used by {owners[doc_id]}")
+            else:
+                owners[doc_id] = key
+        
+        # Purge vectors for files that disappeared
+        for key in [key for key in indexed if key not in files]:
+            entry = indexed.pop(key)
+            try:
+                removed = vector_store.delete_document(entry["document_id"])
+                summary["removed"].append(entry["document_id"])
+                print(f"🗑️  Removed '{entry['document_id']}' ({removed} chunks) - {key} no longer exists")
+            except Exception as e:
+                indexed[key] = entry  # Retry on the next run
+                summary["failed"].append(entry["document_id"])
+                print(f"   ❌ Failed to remove {key}: {e}")
+        
+        # Only files whose size or mtime moved (or that were chunked differently) need to be read at all
+        changed = {}
+        for key, path in files.items():
+            entry = indexed.get(key)
+            if (entry and {k: entry.get(k) for k in ("size", "mtime_ns")} == _file_signature(path)
+                    and entry.get("chunker") == vector_store.chunker_key):
+                summary["unchanged"].append(entry["document_id"])
+            else:
+                changed[key] = path
+        
+        if changed:
+            print(f"\n📚 {len(changed)} new or modified document(s) to index ({len(files)} total):")
+            owns_parser = parser is None
+            if owns_parser:
+                parser = DoclingProcessPool()
+            # Enough threads to keep every parser process busy alongside text files
+            threads = max(1, workers, parser.processes if any(p.suffix.lower() in DOCLING_EXTENSIONS for p in changed.values()) else 1)
+            try:
+                with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="persistent-index") as pool:
+                    futures = {key: pool.submit(_index_file, vector_store, path, indexed.get(key), parser) for key, path in changed.items()}
+                    for key, future in futures.items():
+                        path = changed[key]
+                        try:
+                            status, entry = future.result()
+                            indexed[key] = entry
+                            summary[status].append(entry["document_id"])
+                            print(f"   ✅ {status.capitalize()} '{entry['document_id']}' - {len(entry['chunk_ids'])} chunks")
+                        except Exception as e:
+                            summary["failed"].append(persistent_document_id(path))
+                            print(f"   ❌ Failed to ingest {path.name}: {e}")
+            finally:
+                if owns_parser:
+                    parser.shutdown()
+        elif not files:
+            print("📂 No supported documents found in persistent_docs/")
+        
+        save_manifest(manifest, manifest_path)
     
-    print(f"\n🎉 Ingestion complete! Documents are now searchable.\n")
+    print(
+        f"\n🎉 Indexing complete: {len(summary['added'])} added, {len(summary['updated'])} updated, "
+        f"{len(summary['unchanged'])} unchanged, {len(summary['removed'])} removed, {len(summary['failed'])} failed.\n"
+    )
+    return summary
 
 if __name__ == "__main__":
     print("=" * 60)
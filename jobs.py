@@ -0,0 +1,208 @@
+"""
+Background Ingestion Job Queue.
+
+/upload enqueues document ingestion here so parsing and embedding happen
+before the first question arrives. Jobs are keyed by (document_id, store) so
+the chat path can wait on an in-flight ingestion, or reuse a finished one,
+instead of starting its own.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Number of documents parsed/embedded concurrently in the background
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Finished jobs kept for status lookups and reuse before the oldest are dropped
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@dataclass
+class IngestionJob:
+    """State of one background ingestion."""
+    job_id: str
+    document_id: str
+    file_path: str
+    is_temporary: bool
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    # Page-batch progress of a streamed PDF ingest (its chunks are already searchable)
+    progress: Optional[dict] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def to_dict(self) -> dict:
+        """Serializable view for the /jobs endpoint."""
+        duration = None
+        if self.started_at and self.finished_at:
+            duration = round(self.finished_at - self.started_at, 3)
+        return {
+            "job_id": self.job_id,
+            "document_id": self.document_id,
+            "file_path": self.file_path,
+            "store": "temporary" if self.is_temporary else "persistent",
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_s": duration,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class IngestionJobQueue:
+    """Runs document ingestion on a background worker pool."""
+
+    def __init__(self, max_workers: int = INGEST_WORKERS):
+        """
+        Initialize the job queue.
+
+        Args:
+            max_workers: Number of ingestion worker threads
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._lock = threading.Lock()
+        self._jobs: dict[str, IngestionJob] = {}
+        self._by_document: dict[tuple[str, bool], str] = {}
+
+    def submit(self, file_path: str, document_id: str, is_temporary: bool = True) -> IngestionJob:
+        """
+        Enqueue ingestion of a document, or return the existing job for it.
+
+        A queued, running or completed job for the same document and store is
+        returned as-is; a failed one, or a completed one whose vectors have
+        since been evicted from the temporary store, is rerun as a new job.
+
+        Args:
+            file_path: Path to the document file
+            document_id: Vector store document ID
+            is_temporary: Target the temporary (in-memory) store instead of the persistent one
+
+        Returns:
+            The job tracking this document's ingestion
+        """
+        key = (document_id, is_temporary)
+        with self._lock:
+            existing = self._jobs.get(self._by_document.get(key))
+        # The eviction check reads Chroma, so it runs outside the lock
+        evicted = existing is not None and self._is_evicted(existing)
+
+        with self._lock:
+            # Another submit may have replaced the job meanwhile; a fresh one needs no check
+            current = self._jobs.get(self._by_document.get(key))
+            if current is not None and current.status != FAILED and not (current is existing and evicted):
+                return current
+
+            job = IngestionJob(
+                job_id=str(uuid.uuid4()),
+                document_id=document_id,
+                file_path=file_path,
+                is_temporary=is_temporary
+            )
+            self._jobs[job.job_id] = job
+            self._by_document[key] = job.job_id
+            job.future = self._executor.submit(self._run, job)
+            self._prune()
+            return job
+
+    def _run(self, job: IngestionJob) -> dict:
+        """Worker body: ingest the document and record the outcome on the job."""
+        from tools import ingest_file
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = ingest_file(
+                job.file_path,
+                job.document_id,
+                job.is_temporary,
+                on_progress=lambda progress: setattr(job, "progress", progress)
+            )
+            job.status = COMPLETED
+            return job.result
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            print(f"❌ Ingestion job {job.job_id} for '{job.document_id}' failed: {e}")
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    @staticmethod
+    def _is_evicted(job: IngestionJob) -> bool:
+        """True for a completed temporary-store job whose chunks are no longer stored."""
+        if job.status != COMPLETED or not job.is_temporary or (job.result or {}).get("chunks") == 0:
+            return False
+        from vector_store import get_loaded_temporary_store
+        store = get_loaded_temporary_store()
+        return store is not None and not store.has_document(job.document_id)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS (caller holds the lock)."""
+        finished = [job for job in self._jobs.values() if job.is_finished]
+        excess = len(finished) - MAX_FINISHED_JOBS
+        if excess <= 0:
+            return
+        finished.sort(key=lambda job: job.finished_at or job.created_at)
+        for job in finished[:excess]:
+            del self._jobs[job.job_id]
+            key = (job.document_id, job.is_temporary)
+            if self._by_document.get(key) == job.job_id:
+                del self._by_document[key]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Look up a job by ID."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_for_document(self, document_id: str, is_temporary: bool = True) -> Optional[IngestionJob]:
+        """Look up the latest job for a document, if any."""
+        with self._lock:
+            job_id = self._by_document.get((document_id, is_temporary))
+            return self._jobs.get(job_id) if job_id else None
+
+    def get_stats(self) -> dict:
+        """Counts of tracked jobs by status."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def shutdown(self):
+        """Stop accepting jobs and drop the ones that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global singleton instance
+_ingestion_queue_instance: Optional[IngestionJobQueue] = None
+_ingestion_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue() -> IngestionJobQueue:
+    """Get or create the process-wide ingestion job queue."""
+    global _ingestion_queue_instance
+
+    if _ingestion_queue_instance is None:
+        with _ingestion_queue_lock:
+            if _ingestion_queue_instance is None:
+                _ingestion_queue_instance = IngestionJobQueue()
+    return _ingestion_queue_instance
@@ -0,0 +1,164 @@
+"""
+Lexical (BM25) Index.
+
+In-memory inverted index over the chunks of one vector store collection,
+kept in step with it at ingest and delete time. It catches exact-term
+questions (amounts, policy codes, names) that embeddings rank poorly, and
+is fused with vector results in VectorStoreManager.search.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+# Question words and function words that carry no lexical signal
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from had has have how i if in is it its
+me my of on or our so that the their them there these they this to was we were
+what when where which who whom why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Thread-safe, incrementally updated BM25 index of chunk texts."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term-frequency saturation
+            b: Document-length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> chunk id -> tf
+        self._terms: Dict[str, Tuple[str, ...]] = {}  # chunk id -> distinct terms
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Optional[str]] = {}  # chunk id -> document_id
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, ids: List[str], texts: List[str], document_ids: List[Optional[str]]):
+        """
+        Index (or re-index) chunks.
+
+        Args:
+            ids: Chunk IDs
+            texts: Chunk texts
+            document_ids: Owning document of each chunk, for filtered search
+        """
+        with self._lock:
+            self._remove_locked(ids)
+            for chunk_id, text, document_id in zip(ids, texts, document_ids):
+                counts = Counter(tokenize(text or ""))
+                for term, tf in counts.items():
+                    self._postings[term][chunk_id] = tf
+                length = sum(counts.values())
+                self._terms[chunk_id] = tuple(counts)
+                self._lengths[chunk_id] = length
+                self._documents[chunk_id] = document_id
+                self._total_length += length
+
+    def remove(self, ids: Iterable[str]):
+        """Drop chunks from the index (unknown IDs are ignored)."""
+        with self._lock:
+            self._remove_locked(ids)
+
+    def _remove_locked(self, ids: Iterable[str]):
+        for chunk_id in ids:
+            terms = self._terms.pop(chunk_id, None)
+            if terms is None:
+                continue
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._lengths.pop(chunk_id)
+            self._documents.pop(chunk_id, None)
+
+    def clear(self):
+        """Remove everything."""
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._lengths.clear()
+            self._documents.clear()
+            self._total_length = 0
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._lengths) - df + 0.5) / (df + 0.5))
+
+    def rare_terms(self, query: str, min_idf: float) -> List[str]:
+        """
+        Query terms that occur in the index but in few chunks.
+
+        Args:
+            query: Query text
+            min_idf: Minimum IDF for a term to count as rare
+
+        Returns:
+            Matching terms (absent terms are not rare, just unmatched)
+        """
+        with self._lock:
+            return [
+                term for term in set(tokenize(query))
+                if term in self._postings and self._idf(term) >= min_idf
+            ]
+
+    def search(self, query: str, top_k: int = 10, document_id: Optional[str] = None) -> List[Tuple[str, float, float]]:
+        """
+        Rank chunks by BM25 against a query.
+
+        Args:
+            query: Query text
+            top_k: Number of results
+            document_id: Optional filter by owning document
+
+        Returns:
+            List of (chunk id, BM25 score, coverage) best first, where coverage
+            is the IDF-weighted fraction of query terms found in the chunk (0-1)
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._lengths:
+                return []
+            average_length = self._total_length / len(self._lengths) or 1
+            idfs = {term: self._idf(term) for term in terms}
+            total_idf = sum(idfs.values()) or 1
+
+            scores: Dict[str, float] = defaultdict(float)
+            matched_idf: Dict[str, float] = defaultdict(float)
+            for term, idf in idfs.items():
+                for chunk_id, tf in self._postings.get(term, {}).items():
+                    if document_id and self._documents.get(chunk_id) != document_id:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+                    matched_idf[chunk_id] += idf
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(chunk_id, score, matched_idf[chunk_id] / total_idf) for chunk_id, score in ranked]
+
+    def get_stats(self) -> dict:
+        """Index size."""
+        with self._lock:
+            return {
+                "chunks": len(self._lengths),
+                "terms": len(self._postings),
+                "avg_chunk_terms": round(self._total_length / len(self._lengths), 1) if self._lengths else 0
+            }
@@ -1,17 +1,28 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
 import shutil
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from langchain_core.messages import HumanMessage
 from database import create_db_and_tables
-from agents import app as agent_app
+from agents import app as agent_app, ANSWER_TAG, PROGRESS_EVENT, document_id_for_path
+from concurrency import run_blocking, shutdown_executor
+from jobs import get_ingestion_queue
+from persistent_watcher import PERSISTENT_DOCS_WATCH, PersistentDocsWatcher
+from ingest_persistent_docs import persistent_document_id
+from document_loader import DOCLING_PREWARM, get_converter_pool
+from markdown_cache import get_markdown_cache
+from vector_store import get_loaded_temporary_store
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -22,13 +33,28 @@ UPLOADS_DIR = Path("uploads")  # Temporary uploads (cleared periodically)
 PERSISTENT_DIR = Path("persistent_docs")  # Permanent documents (company policies, etc.)
 CHROMA_DB_DIR = Path("chroma_db")  # Vector store (persists independently)
 
+# Upload limits - files are streamed to disk in chunks, so the cap bounds disk use, not RAM
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
+MAX_FILE_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB read/write chunks
+UPLOAD_FORM_OVERHEAD = 64 * 1024  # Allowance for multipart boundaries and headers
+CONTENT_ID_LENGTH = 32  # Hex chars of the SHA-256 used as the stored file name / document id
+
+# Batch chat limits
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "4"))
+# Upper bound on a batch's requested max_concurrency
+CHAT_BATCH_CONCURRENCY_LIMIT = int(os.getenv("CHAT_BATCH_CONCURRENCY_LIMIT", "16"))
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "500"))
+
 def cleanup_old_uploads(max_age_hours: int = 24):
-    """Clean up temporary uploads older than max_age_hours."""
+    """Clean up temporary uploads older than max_age_hours, with their vectors and cached parsed markdown."""
     if not UPLOADS_DIR.exists():
         return
     
     cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
     removed_count = 0
+    removed_hashes = []
+    removed_document_ids = []
     
     for file_path in UPLOADS_DIR.glob('*'):
         if file_path.is_file():
@@ -37,11 +63,37 @@ def cleanup_old_uploads(max_age_hours: int = 24):
                 try:
                     file_path.unlink()
                     removed_count += 1
+                    # Uploads are stored as <content hash prefix>.<ext>
+                    removed_hashes.append(file_path.stem)
+                    removed_document_ids.append(document_id_for_path(str(file_path)))
                 except Exception as e:
                     print(f"Failed to delete {file_path}: {e}")
     
     if removed_count > 0:
         print(f"✅ Cleaned up {removed_count} old temporary files from uploads/")
+    
+    # Drop the removed uploads' chunks (and any expired documents) from the in-memory store
+    temporary_store = get_loaded_temporary_store()
+    if temporary_store:
+        evicted = temporary_store.evict_documents(removed_document_ids) + temporary_store.enforce_budget()
+        if evicted > 0:
+            print(f"✅ Evicted {evicted} documents from the temporary vector store")
+    
+    markdown_cache = get_markdown_cache()
+    if markdown_cache:
+        removed_hashes = [h for h in removed_hashes if len(h) == CONTENT_ID_LENGTH]
+        cached_count = markdown_cache.remove_for_hashes(removed_hashes)
+        markdown_cache.prune()
+        if cached_count > 0:
+            print(f"✅ Removed {cached_count} cached parsed documents for deleted uploads")
+
+def _report_warm_up(task: asyncio.Task):
+    """Done-callback of the converter warm-up task: surface failures instead of dropping them."""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error:
+        print(f"⚠️ Document converter warm-up failed: {error}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -61,8 +113,31 @@ async def lifespan(app: FastAPI):
     print(f"   - Persistent docs: {PERSISTENT_DIR.absolute()}")
     print(f"   - Vector store: {CHROMA_DB_DIR.absolute()}")
     
+    # Optionally load Docling models in the background so the first upload doesn't pay for it
+    # (kept on app.state so the task isn't garbage-collected mid-flight)
+    app.state.warm_up_task = None
+    if DOCLING_PREWARM:
+        app.state.warm_up_task = asyncio.create_task(run_blocking(get_converter_pool().warm_up))
+        app.state.warm_up_task.add_done_callback(_report_warm_up)
+    
+    # Optionally keep the persistent collection in sync with persistent_docs/
+    watcher = None
+    if PERSISTENT_DOCS_WATCH:
+        watcher = PersistentDocsWatcher(PERSISTENT_DIR)
+        watcher.start()
+    
     yield
     # Shutdown
+    if app.state.warm_up_task and not app.state.warm_up_task.done():
+        app.state.warm_up_task.cancel()
+        try:
+            await app.state.warm_up_task
+        except asyncio.CancelledError:
+            pass
+    if watcher:
+        await watcher.stop()
+    get_ingestion_queue().shutdown()
+    shutdown_executor()
 
 app = FastAPI(title="Multi-Agent AI Backend", lifespan=lifespan)
 
@@ -75,27 +150,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads whose declared size is over the limit before the body is read."""
+    if request.url.path == "/upload":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds maximum allowed size ({MAX_UPLOAD_SIZE_MB}MB)"}
+            )
+    return await call_next(request)
+
 class ChatRequest(BaseModel):
     query: str
     file_path: str | None = None
     thread_id: str = "default"
 
+class BatchChatRequest(BaseModel):
+    requests: list[ChatRequest]
+    max_concurrency: int | None = None  # Defaults to CHAT_BATCH_MAX_CONCURRENCY, capped at CHAT_BATCH_CONCURRENCY_LIMIT
+
 class UploadRequest(BaseModel):
     persistent: bool = False  # If True, store in persistent_docs instead of uploads
 
+def build_workflow_inputs(request: ChatRequest) -> dict:
+    """Build the LangGraph input state for a chat request."""
+    inputs = {"messages": [HumanMessage(content=request.query)]}
+    if request.file_path:
+        inputs["file_path"] = request.file_path
+    return inputs
+
+def format_sse(event: str, data: dict) -> str:
+    """Serialize one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """
     Process a user query through the Agentic Workflow.
     Optionally accepts a file_path for document QA.
     """
-    inputs = {"messages": [HumanMessage(content=request.query)]}
-    if request.file_path:
-        inputs["file_path"] = request.file_path
+    inputs = build_workflow_inputs(request)
     
     try:
-        # Invoke the LangGraph workflow
-        result = agent_app.invoke(inputs)
+        # Run the LangGraph workflow without blocking the event loop
+        result = await agent_app.ainvoke(inputs)
         final_message = result["messages"][-1].content
         return {"response": final_message}
     except StopIteration as e:
@@ -109,6 +209,160 @@ async def chat(request: ChatRequest):
         print(f"❌ Error Details:\n{error_details}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/batch")
+async def chat_batch(batch: BatchChatRequest):
+    """
+    Run many chat requests through the workflow concurrently.
+    
+    Identical requests (same query and file) run once and share the result.
+    Every distinct file's ingestion is started up front without waiting; the
+    questions about a file then share its job through the queue, while
+    questions without a file start immediately. Results are returned in
+    input order; a failing item reports its error without failing the batch.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one request")
+    if len(batch.requests) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds maximum of {CHAT_BATCH_MAX_ITEMS} requests")
+    
+    max_concurrency = CHAT_BATCH_MAX_CONCURRENCY if batch.max_concurrency is None else batch.max_concurrency
+    if max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    max_concurrency = min(max_concurrency, CHAT_BATCH_CONCURRENCY_LIMIT)
+    
+    batch_start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    # Start every distinct file's ingestion now; doc_agent waits on (only) its own file's job
+    file_paths = sorted({req.file_path for req in batch.requests if req.file_path})
+    ingestion_queue = get_ingestion_queue()
+    for path in file_paths:
+        await run_blocking(ingestion_queue.submit, path, document_id_for_path(path), is_temporary=True)
+    
+    # Collapse identical requests so shared questions are answered once
+    unique_keys: dict[tuple, int] = {}
+    for req in batch.requests:
+        unique_keys.setdefault((req.query, req.file_path), len(unique_keys))
+    
+    async def run_one(query: str, file_path: str | None) -> dict:
+        inputs = build_workflow_inputs(ChatRequest(query=query, file_path=file_path))
+        async with semaphore:
+            item_start = time.perf_counter()
+            try:
+                result = await agent_app.ainvoke(inputs)
+                outcome = {"response": result["messages"][-1].content}
+            except StopIteration:
+                outcome = {"error": "Model returned empty response. Try a different model or check API configuration."}
+            except Exception as e:
+                print(f"❌ Batch item failed: {e}")
+                outcome = {"error": str(e)}
+            outcome["elapsed_ms"] = round((time.perf_counter() - item_start) * 1000, 1)
+            return outcome
+    
+    unique_outcomes = await asyncio.gather(*(run_one(query, file_path) for query, file_path in unique_keys))
+    
+    results = []
+    for index, req in enumerate(batch.requests):
+        outcome = unique_outcomes[unique_keys[(req.query, req.file_path)]]
+        results.append({"index": index, "success": "error" not in outcome, **outcome})
+    
+    total_ms = (time.perf_counter() - batch_start) * 1000
+    item_times = [outcome["elapsed_ms"] for outcome in unique_outcomes]
+    succeeded = sum(1 for item in results if item["success"])
+    
+    return {
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "unique_requests": len(unique_keys),
+            "files_ingested": len(file_paths),
+            "max_concurrency": max_concurrency,
+            "total_ms": round(total_ms, 1),
+            "avg_item_ms": round(sum(item_times) / len(item_times), 1),
+            "max_item_ms": max(item_times),
+            "throughput_per_s": round(len(results) / (total_ms / 1000), 2) if total_ms else None
+        }
+    }
+
+async def stream_chat_events(inputs: dict):
+    """
+    Run the workflow and yield server-sent events as it progresses.
+    
+    Events:
+        progress: workflow steps (routing, ingestion, web fallback, ...)
+        token: incremental text from the answer-producing LLM calls
+        final: the complete response once the graph finishes
+        error: the workflow failed; no final event follows
+    """
+    yield format_sse("progress", {"message": "Request received", "stage": "received"})
+    
+    try:
+        async for event in agent_app.astream_events(inputs, version="v2"):
+            kind = event["event"]
+            
+            if kind == "on_custom_event" and event["name"] == PROGRESS_EVENT:
+                yield format_sse("progress", event["data"])
+            
+            elif kind == "on_chat_model_stream" and ANSWER_TAG in event.get("tags", []):
+                content = event["data"]["chunk"].content
+                if isinstance(content, str) and content:
+                    yield format_sse("token", {"text": content, "node": event["metadata"].get("langgraph_node")})
+            
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Root graph finished - emit the full answer (covers non-LLM responses too)
+                output = event["data"].get("output") or {}
+                messages = output.get("messages") if isinstance(output, dict) else None
+                if messages:
+                    yield format_sse("final", {"response": messages[-1].content})
+    except Exception as e:
+        import traceback
+        print(f"❌ Streaming Error Details:\n{traceback.format_exc()}")
+        yield format_sse("error", {"detail": str(e)})
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Stream a chat response as server-sent events.
+    Emits progress events and answer tokens as soon as they are available,
+    followed by a final event carrying the complete response.
+    """
+    return StreamingResponse(
+        stream_chat_events(build_workflow_inputs(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_upload_to_disk(file: UploadFile, destination: Path) -> tuple[int, str]:
+    """
+    Copy an upload to destination in fixed-size chunks.
+    
+    Enforces MAX_FILE_SIZE while copying and computes the SHA-256 of the
+    content on the fly. The partial file is removed if anything fails.
+    
+    Returns:
+        (file_size_bytes, sha256_hexdigest)
+    """
+    hasher = hashlib.sha256()
+    file_size = 0
+    try:
+        with open(destination, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    # Same status as the Content-Length check in reject_oversized_uploads
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds maximum allowed size ({MAX_UPLOAD_SIZE_MB}MB)"
+                    )
+                hasher.update(chunk)
+                await run_blocking(buffer.write, chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return file_size, hasher.hexdigest()
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...), persistent: bool = False):
     """
@@ -121,12 +375,15 @@ async def upload_file(file: UploadFile = File(...), persistent: bool = False):
                    If False, store in uploads/ (temporary, cleaned up after 24h)
     
     Supports: PDF, TXT, MD, DOCX files
-    Max size: 10MB
+    Max size: MAX_UPLOAD_SIZE_MB (default 50MB), enforced while streaming to disk
+    
+    Files are content-addressed: the stored name is derived from the SHA-256
+    of the bytes, so re-uploading an identical file returns the existing
+    file_path/document_id and reuses the vectors already indexed for it.
     
     Note: Vectors are ALWAYS stored persistently in ChromaDB regardless of file location
     """
     # File validation
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
     ALLOWED_EXTENSIONS = {'pdf', 'txt', 'md', 'docx'}
     
     try:
@@ -145,34 +402,42 @@ async def upload_file(file: UploadFile = File(...), persistent: bool = False):
         storage_dir = PERSISTENT_DIR if persistent else UPLOADS_DIR
         storage_type = "persistent" if persistent else "temporary"
         
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        file_name = f"{file_id}.{file_ext}"
-        file_path = storage_dir / file_name
-        
-        # Read and validate file size
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File size ({file_size / 1024 / 1024:.2f}MB) exceeds maximum allowed size (10MB)"
-            )
+        # Stream to a temporary name, enforcing the size limit and hashing as we go
+        temp_path = storage_dir / f".{uuid.uuid4()}.part"
+        file_size, content_hash = await stream_upload_to_disk(file, temp_path)
         
         if file_size == 0:
+            temp_path.unlink(missing_ok=True)
             raise HTTPException(status_code=400, detail="File is empty")
         
-        # Write file to disk
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        # Key the stored file by content hash so identical uploads collapse to one
+        file_id = content_hash[:CONTENT_ID_LENGTH]
+        file_name = f"{file_id}.{file_ext}"
+        file_path = storage_dir / file_name
+        
+        deduplicated = file_path.exists()
+        if deduplicated:
+            temp_path.unlink(missing_ok=True)
+            # Refresh mtime so the 24h cleanup counts from the latest upload
+            os.utime(file_path)
+        else:
+            os.replace(temp_path, file_path)
+        
+        # Start parsing/embedding now so the first question only pays for retrieval.
+        # Persistent docs use the same document_id as ingest_persistent_docs.py
+        document_id = persistent_document_id(file_path) if persistent else document_id_for_path(str(file_path))
+        job = await run_blocking(get_ingestion_queue().submit, str(file_path.absolute()), document_id, is_temporary=not persistent)
         
         return {
-            "message": f"File uploaded successfully ({storage_type})", 
+            "message": f"File {'already uploaded' if deduplicated else 'uploaded successfully'} ({storage_type})", 
             "file_path": str(file_path.absolute()),
-            "document_id": f"{file_id}_{file_ext}",
+            "document_id": document_id,
+            "job_id": job.job_id,
+            "ingestion_status": job.status,
             "file_size": f"{file_size / 1024:.2f}KB",
             "file_type": file_ext,
+            "sha256": content_hash,
+            "deduplicated": deduplicated,
             "storage_type": storage_type,
             "note": "Vectors stored persistently in ChromaDB"
         }
@@ -182,6 +447,34 @@ async def upload_file(file: UploadFile = File(...), persistent: bool = False):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a background ingestion job started by /upload."""
+    job = get_ingestion_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job.to_dict()
+
+@app.get("/stats")
+async def get_stats():
+    """Runtime metrics: embedding micro-batching and caches, document converters and parse cache, temporary store budget, and background ingestion jobs."""
+    from embeddings import get_embedding_stats
+    from embedding_cache import get_embedding_cache
+    from vector_store import get_query_cache_stats
+    
+    embedding_cache = get_embedding_cache()
+    markdown_cache = get_markdown_cache()
+    temporary_store = get_loaded_temporary_store()
+    return {
+        "embeddings": get_embedding_stats(),
+        "embedding_cache": await run_blocking(embedding_cache.get_stats) if embedding_cache else {"enabled": False},
+        "query_cache": get_query_cache_stats(),
+        "document_converters": get_converter_pool().get_stats(),
+        "markdown_cache": await run_blocking(markdown_cache.get_stats) if markdown_cache else {"enabled": False},
+        "temporary_store": temporary_store.get_store_stats() if temporary_store else {"loaded": False},
+        "ingestion_jobs": get_ingestion_queue().get_stats()
+    }
+
 @app.get("/storage/info")
 async def get_storage_info():
     """Get information about storage usage."""
@@ -197,9 +490,9 @@ async def get_storage_info():
                 count += 1
         return total, count
     
-    uploads_size, uploads_count = get_dir_size(UPLOADS_DIR)
-    persistent_size, persistent_count = get_dir_size(PERSISTENT_DIR)
-    chroma_size, _ = get_dir_size(CHROMA_DB_DIR)
+    uploads_size, uploads_count = await run_blocking(get_dir_size, UPLOADS_DIR)
+    persistent_size, persistent_count = await run_blocking(get_dir_size, PERSISTENT_DIR)
+    chroma_size, _ = await run_blocking(get_dir_size, CHROMA_DB_DIR)
     
     return {
         "temporary_uploads": {
@@ -227,7 +520,8 @@ async def cleanup_storage(max_age_hours: int = 24):
     if max_age_hours < 1 or max_age_hours > 168:  # 1 hour to 1 week
         raise HTTPException(status_code=400, detail="max_age_hours must be between 1 and 168")
     
-    cleanup_old_uploads(max_age_hours)
+    # Deletes files, evicts vectors and prunes the markdown cache - keep it off the event loop
+    await run_blocking(cleanup_old_uploads, max_age_hours)
     return {"message": f"Cleanup completed for files older than {max_age_hours} hours"}
 
 # Serve React Frontend (for production/Docker)
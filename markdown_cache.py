@@ -0,0 +1,166 @@
+"""
+Parsed Markdown Cache.
+
+Disk cache of Docling `export_to_markdown()` output keyed by the SHA-256 of
+the source file plus the converter settings that produced it, so parsing
+the same bytes twice (repeated read_document_with_docling calls, re-uploads,
+re-ingestion) is a file read. Entries are plain .md files; the cache is
+bounded by total size and evicts the least recently used files first.
+"""
+
+import os
+import uuid
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+MARKDOWN_CACHE_ENABLED = os.getenv("MARKDOWN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+MARKDOWN_CACHE_DIR = Path(os.getenv("MARKDOWN_CACHE_DIR", ".cache/markdown"))
+MARKDOWN_CACHE_MAX_MB = int(os.getenv("MARKDOWN_CACHE_MAX_MB", "512"))
+# When over the limit, evict down to this fraction of the max size
+_EVICT_TO_FRACTION = 0.9
+
+
+class MarkdownCache:
+    """On-disk cache of parsed document markdown with LRU eviction by size."""
+
+    def __init__(self, directory: Path = MARKDOWN_CACHE_DIR, max_mb: int = MARKDOWN_CACHE_MAX_MB):
+        """
+        Initialize the markdown cache.
+
+        Args:
+            directory: Directory holding cached .md files
+            max_mb: Maximum total size before LRU eviction
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_path(self, content_hash: str, settings_key: str) -> Path:
+        return self.directory / f"{content_hash}-{settings_key}.md"
+
+    def get(self, content_hash: str, settings_key: str) -> Optional[str]:
+        """
+        Look up cached markdown.
+
+        Args:
+            content_hash: SHA-256 of the source file bytes
+            settings_key: Identity of the converter settings
+
+        Returns:
+            Cached markdown, or None on a miss
+        """
+        path = self._entry_path(content_hash, settings_key)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, content_hash: str, settings_key: str, markdown: str):
+        """
+        Store parsed markdown, evicting least recently used entries if over size.
+
+        Args:
+            content_hash: SHA-256 of the source file bytes
+            settings_key: Identity of the converter settings
+            markdown: Parsed document text
+        """
+        path = self._entry_path(content_hash, settings_key)
+        # Write-then-rename so concurrent readers (and parser processes) never see a partial file
+        temp_path = path.with_name(f".{uuid.uuid4().hex}.part")
+        try:
+            temp_path.write_text(markdown, encoding="utf-8")
+            os.replace(temp_path, path)
+        except OSError as e:
+            temp_path.unlink(missing_ok=True)
+            print(f"⚠️ Could not cache parsed markdown: {e}")
+            return
+        self.prune()
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob("*.md"):
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                continue  # Removed concurrently
+        return entries
+
+    def prune(self):
+        """Evict least recently used entries until the cache is under its size limit."""
+        with self._lock:
+            entries = self._entries()
+            total = sum(stat.st_size for _, stat in entries)
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * _EVICT_TO_FRACTION)
+            for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= stat.st_size
+                self.evictions += 1
+
+    def remove_for_hashes(self, hash_prefixes: Iterable[str]) -> int:
+        """
+        Drop every cached entry whose content hash starts with one of the prefixes.
+
+        Args:
+            hash_prefixes: Full or truncated content hashes (e.g. upload file stems)
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        for prefix in set(hash_prefixes):
+            if not prefix:
+                continue
+            for path in self.directory.glob(f"{prefix}*.md"):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def get_stats(self) -> dict:
+        """Entry count, size and hit/miss counters."""
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": str(self.directory),
+                "entries": len(entries),
+                "size_mb": round(sum(stat.st_size for _, stat in entries) / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+                "evictions": self.evictions
+            }
+
+
+# Global singleton instance
+_markdown_cache_instance: Optional[MarkdownCache] = None
+_markdown_cache_lock = threading.Lock()
+
+
+def get_markdown_cache() -> Optional[MarkdownCache]:
+    """Get the process-wide markdown cache, or None if disabled."""
+    global _markdown_cache_instance
+
+    if not MARKDOWN_CACHE_ENABLED:
+        return None
+    if _markdown_cache_instance is None:
+        with _markdown_cache_lock:
+            if _markdown_cache_instance is None:
+                _markdown_cache_instance = MarkdownCache()
+    return _markdown_cache_instance
@@ -0,0 +1,42 @@
+"""
+Migrate an existing chroma_db/ collection to cosine distance.
+
+Collections created before scores became cosine similarities use Chroma's
+default L2 space. VectorStoreManager migrates them on open (unless
+VECTOR_STORE_AUTO_MIGRATE=false); this script does it ahead of time, e.g.
+before deploying, so the first request doesn't pay for the copy. Stored
+embeddings are copied as-is, nothing is re-embedded.
+
+Usage:
+    python migrate_chroma_cosine.py
+    python migrate_chroma_cosine.py --path chroma_db --collection documents
+"""
+import argparse
+import time
+import chromadb
+from chromadb.config import Settings
+from vector_store import collection_space, migrate_collection_to_cosine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate a Chroma collection to cosine space")
+    parser.add_argument("--path", default="./chroma_db", help="Chroma persist directory")
+    parser.add_argument("--collection", default="documents")
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=args.path, settings=Settings(anonymized_telemetry=False))
+    start = time.perf_counter()
+    migrated = migrate_collection_to_cosine(client, args.collection)
+    space = collection_space(client.get_collection(name=args.collection))
+
+    if migrated:
+        print(f"✅ Migrated {migrated} chunks of '{args.collection}' to {space} space in {time.perf_counter() - start:.1f}s")
+    else:
+        print(f"✅ '{args.collection}' already uses {space} space - nothing to do")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("CHROMA COSINE MIGRATION")
+    print("=" * 60)
+    main()
@@ -0,0 +1,93 @@
+"""
+Persistent Docs Watcher.
+
+Optional background task (PERSISTENT_DOCS_WATCH=true) started from
+main.lifespan that keeps the persistent collection in sync with
+persistent_docs/. Filesystem events are debounced and trigger the
+incremental indexer, which adds, updates or removes only the documents that
+changed. Uses watchfiles when available and falls back to periodic polling,
+which is cheap because unchanged files are skipped on size/mtime alone.
+One Docling process pool lives as long as the watcher, so an edit doesn't
+respawn parser processes and reload their models.
+"""
+
+import os
+import asyncio
+from pathlib import Path
+from typing import Optional
+from concurrency import run_blocking
+from ingest_persistent_docs import PERSISTENT_DIR, SUPPORTED_EXTENSIONS, ingest_persistent_docs
+from document_loader import DoclingProcessPool
+try:
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+PERSISTENT_DOCS_WATCH = os.getenv("PERSISTENT_DOCS_WATCH", "false").lower() in ("1", "true", "yes")
+# Quiet period after the last change before re-indexing
+PERSISTENT_WATCH_DEBOUNCE_MS = int(os.getenv("PERSISTENT_WATCH_DEBOUNCE_MS", "1000"))
+# Rescan interval when watchfiles is not installed
+PERSISTENT_WATCH_POLL_SECONDS = float(os.getenv("PERSISTENT_WATCH_POLL_SECONDS", "5"))
+
+
+def _is_document(_change, path: str) -> bool:
+    """watchfiles filter: only supported document types (ignores .part temp files)."""
+    return Path(path).suffix.lower() in SUPPORTED_EXTENSIONS
+
+
+class PersistentDocsWatcher:
+    """Re-indexes persistent_docs/ in the background when files change."""
+
+    def __init__(self, directory: Path = PERSISTENT_DIR):
+        """
+        Initialize the watcher.
+
+        Args:
+            directory: Directory of persistent documents to watch
+        """
+        self.directory = directory
+        # Parser processes start on the first PDF/DOCX and stay warm between runs
+        self.parser = DoclingProcessPool()
+        self._stop_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start watching on the running event loop."""
+        self._task = asyncio.create_task(self._run(), name="persistent-docs-watcher")
+
+    async def stop(self):
+        """Stop watching and wait for an in-progress index run to finish."""
+        self._stop_event.set()
+        if self._task:
+            try:
+                await self._task
+            except Exception as e:
+                print(f"⚠️ Persistent docs watcher stopped with error: {e}")
+        await run_blocking(self.parser.shutdown)
+
+    async def _reindex(self):
+        try:
+            await run_blocking(ingest_persistent_docs, self.directory, parser=self.parser)
+        except Exception as e:
+            print(f"❌ Persistent docs re-index failed: {e}")
+
+    async def _run(self):
+        # Catch up on changes made while the server was down
+        await self._reindex()
+
+        if awatch:
+            print(f"👀 Watching {self.directory.absolute()} for document changes")
+            async for _changes in awatch(
+                self.directory,
+                watch_filter=_is_document,
+                debounce=PERSISTENT_WATCH_DEBOUNCE_MS,
+                stop_event=self._stop_event
+            ):
+                await self._reindex()
+        else:
+            print(f"👀 Polling {self.directory.absolute()} every {PERSISTENT_WATCH_POLL_SECONDS}s (install watchfiles for instant updates)")
+            while not self._stop_event.is_set():
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=PERSISTENT_WATCH_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    await self._reindex()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from dotenv import load_dotenv
@@ -27,7 +28,7 @@ def run_test(query: str, file_path: str = None, test_name: str = ""):
         if file_path:
             inputs["file_path"] = file_path
             
-        result = app.invoke(inputs)
+        result = asyncio.run(app.ainvoke(inputs))
         print("\n✅ Response:")
         print(result["messages"][-1].content)
         print(f"\n{'='*80}\n")
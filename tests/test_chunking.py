@@ -0,0 +1,73 @@
+"""Tests for the pluggable chunkers in chunking.py"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from chunking import CharacterChunker, MarkdownChunker, build_chunker
+
+
+def estimated_tokens(text: str) -> int:
+    """Token count MarkdownChunker uses without a tokenizer."""
+    return max(1, len(text) // 4)
+
+
+def test_character_chunker_windows_overlap():
+    chunks = CharacterChunker(chunk_size=10, chunk_overlap=3).split("abcdefghijklmnopqrstuvwxyz")
+    assert chunks[0] == "abcdefghij"
+    assert chunks[1].startswith("hij")
+    assert "".join(chunk[3:] if i else chunk for i, chunk in enumerate(chunks)) == "abcdefghijklmnopqrstuvwxyz"
+
+
+def test_markdown_chunker_prefixes_heading_path():
+    text = "# Policy\n\n## Eligibility\n\nFull-time employees may work remotely.\n\n## Stipend\n\nA yearly stipend is paid."
+    chunks = MarkdownChunker(max_tokens=64, overlap_tokens=0).split(text)
+    assert chunks == [
+        "Policy > Eligibility\n\nFull-time employees may work remotely.",
+        "Policy > Stipend\n\nA yearly stipend is paid.",
+    ]
+
+
+def test_markdown_chunker_respects_token_budget():
+    paragraph = " ".join(f"Sentence number {i} talks about remote work." for i in range(60))
+    chunks = MarkdownChunker(max_tokens=40, overlap_tokens=8).split(f"# Section\n\n{paragraph}")
+    assert len(chunks) > 1
+    assert all(estimated_tokens(chunk) <= 40 for chunk in chunks)
+    assert all(chunk.startswith("Section\n\n") for chunk in chunks)
+
+
+def test_markdown_chunker_repeats_table_header():
+    header = "| Name | Role |\n|------|------|"
+    rows = [f"| Employee {i} | Engineer {i} |" for i in range(30)]
+    text = "# Staff\n\n" + "\n".join([header] + rows)
+
+    chunks = MarkdownChunker(max_tokens=48, overlap_tokens=0).split(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith(f"Staff\n\n{header}\n")
+        assert chunk.count("| Name | Role |") == 1
+    # Every row lands in exactly one chunk, in order
+    body_rows = [line for chunk in chunks for line in chunk.split("\n")[4:]]
+    assert body_rows == rows
+
+
+def test_markdown_chunker_keeps_code_block_whole():
+    code = "```python\nprint('hello')\nprint('world')\n```"
+    chunks = MarkdownChunker(max_tokens=64, overlap_tokens=0).split(f"Intro line.\n\n{code}\n\nOutro line.")
+    assert any(code in chunk for chunk in chunks)
+
+
+def test_settings_key_tracks_strategy_and_sizes():
+    markdown = MarkdownChunker(max_tokens=256, overlap_tokens=32)
+    assert markdown.settings_key() == "markdown-256-32"
+    assert markdown.settings_key(128, 16) == "markdown-128-16"
+    assert CharacterChunker().settings_key() == "character-500-50"
+
+
+def test_build_chunker_rejects_unknown_name():
+    assert isinstance(build_chunker("character"), CharacterChunker)
+    with pytest.raises(ValueError):
+        build_chunker("sentences")
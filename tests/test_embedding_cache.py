@@ -0,0 +1,53 @@
+"""Tests for the SQLite embedding cache in embedding_cache.py"""
+import itertools
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+
+def make_cache(tmp_path, monkeypatch, max_entries: int) -> EmbeddingCache:
+    # Strictly increasing clock so last_used ordering is deterministic
+    clock = itertools.count(1000.0)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: next(clock))
+    return EmbeddingCache(path=tmp_path / "embeddings.sqlite3", max_entries=max_entries)
+
+
+def vectors(count: int) -> np.ndarray:
+    return np.arange(count * 4, dtype=np.float32).reshape(count, 4)
+
+
+def test_round_trip_is_keyed_by_model(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch, max_entries=100)
+    cache.put_many("model-a", ["alpha", "beta"], vectors(2))
+
+    found = cache.get_many("model-a", ["beta", "gamma", "alpha"])
+    assert sorted(found) == [0, 2]
+    np.testing.assert_array_equal(found[0], vectors(2)[1])
+    np.testing.assert_array_equal(found[2], vectors(2)[0])
+    assert cache.get_many("model-b", ["alpha"]) == {}
+
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 2, 2)
+
+
+def test_put_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch, max_entries=10)
+    texts = [f"text {i}" for i in range(10)]
+    cache.put_many("model", texts, vectors(10))
+    # Touch the oldest entry so it survives eviction
+    assert cache.get_many("model", ["text 0"])
+
+    cache.put_many("model", ["text 10"], vectors(1))
+
+    # 11 entries > 10: evict down to 9, dropping the two least recently used
+    assert cache.get_stats()["entries"] == 9
+    assert cache.evictions == 2
+    remaining = cache.get_many("model", texts + ["text 10"])
+    assert 0 in remaining and 10 in remaining
+    assert 1 not in remaining and 2 not in remaining
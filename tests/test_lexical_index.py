@@ -0,0 +1,75 @@
+"""Tests for the BM25 lexical index in lexical_index.py"""
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from lexical_index import BM25Index, tokenize
+
+
+def build_index() -> BM25Index:
+    index = BM25Index()
+    index.add(
+        ["a_0", "a_1", "b_0"],
+        [
+            "Remote work requires VPN access at all times.",
+            "The home office stipend is 500 USD per year.",
+            "Core hours are 10am to 3pm for every team.",
+        ],
+        ["doc_a", "doc_a", "doc_b"],
+    )
+    return index
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What is the VPN policy?") == ["vpn", "policy"]
+
+
+def test_search_ranks_exact_terms_with_coverage():
+    results = build_index().search("home office stipend")
+    chunk_id, score, coverage = results[0]
+    assert chunk_id == "a_1"
+    assert score > 0
+    assert coverage == 1.0
+
+
+def test_search_filters_by_document():
+    index = build_index()
+    assert index.search("core hours", document_id="doc_a") == []
+    assert [chunk_id for chunk_id, _, _ in index.search("core hours", document_id="doc_b")] == ["b_0"]
+
+
+def test_add_reindexes_existing_ids():
+    index = build_index()
+    index.add(["a_1"], ["Parental leave lasts sixteen weeks."], ["doc_a"])
+
+    assert len(index) == 3
+    assert index.search("stipend") == []
+    assert [chunk_id for chunk_id, _, _ in index.search("parental leave")] == ["a_1"]
+    assert index.get_stats()["chunks"] == 3
+
+
+def test_remove_drops_chunks_and_empty_postings():
+    index = build_index()
+    terms_before = index.get_stats()["terms"]
+    index.remove(["a_1", "unknown"])
+
+    assert len(index) == 2
+    assert index.search("stipend") == []
+    assert index.get_stats()["terms"] < terms_before
+
+    index.remove(["a_0", "b_0"])
+    assert len(index) == 0
+    assert index.get_stats() == {"chunks": 0, "terms": 0, "avg_chunk_terms": 0}
+
+
+def test_rare_terms_only_reports_indexed_rare_terms():
+    index = BM25Index()
+    ids = [f"chunk_{i}" for i in range(40)]
+    texts = ["Employees follow the remote work policy."] * 39 + ["Policy code HR-1042 covers equipment."]
+    index.add(ids, texts, ["doc"] * 40)
+
+    rare = index.rare_terms("Which policy is hr 1042?", min_idf=3.0)
+    assert "1042" in rare
+    assert "policy" not in rare
+    assert index.rare_terms("unknownterm", min_idf=0.0) == []
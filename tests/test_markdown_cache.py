@@ -0,0 +1,71 @@
+"""Tests for the on-disk parsed-markdown cache in markdown_cache.py"""
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from markdown_cache import MarkdownCache
+
+
+def make_cache(tmp_path, max_bytes: int) -> MarkdownCache:
+    cache = MarkdownCache(directory=tmp_path / "markdown")
+    cache.max_bytes = max_bytes
+    return cache
+
+
+def age_entries(cache: MarkdownCache, *content_hashes: str):
+    """Give entries distinct last-used times, oldest first."""
+    for age, content_hash in enumerate(reversed(content_hashes), start=1):
+        path = cache._entry_path(content_hash, "lightweight")
+        os.utime(path, (path.stat().st_atime, path.stat().st_mtime - 100 * age))
+
+
+def test_get_and_put_round_trip(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=1024 * 1024)
+    assert cache.get("abc", "lightweight") is None
+
+    cache.put("abc", "lightweight", "# Title\n\nBody")
+    assert cache.get("abc", "lightweight") == "# Title\n\nBody"
+    assert cache.get("abc", "full") is None
+
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_put_evicts_least_recently_used_by_size(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=2500)
+    cache.put("first", "lightweight", "a" * 1000)
+    cache.put("second", "lightweight", "b" * 1000)
+    age_entries(cache, "first", "second")
+
+    cache.put("third", "lightweight", "c" * 1000)
+
+    assert cache.get("first", "lightweight") is None
+    assert cache.get("second", "lightweight") is not None
+    assert cache.get("third", "lightweight") is not None
+    assert cache.evictions == 1
+    assert sum(path.stat().st_size for path in cache.directory.glob("*.md")) <= cache.max_bytes
+
+
+def test_get_marks_entry_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=2500)
+    cache.put("first", "lightweight", "a" * 1000)
+    cache.put("second", "lightweight", "b" * 1000)
+    age_entries(cache, "first", "second")
+
+    assert cache.get("first", "lightweight") is not None
+    cache.put("third", "lightweight", "c" * 1000)
+
+    assert cache.get("first", "lightweight") is not None
+    assert cache.get("second", "lightweight") is None
+
+
+def test_remove_for_hashes_matches_prefixes(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=1024 * 1024)
+    cache.put("abcdef123", "lightweight", "one")
+    cache.put("abcdef123", "full", "two")
+    cache.put("fedcba987", "lightweight", "three")
+
+    assert cache.remove_for_hashes(["abcdef", ""]) == 2
+    assert cache.get("abcdef123", "full") is None
+    assert cache.get("fedcba987", "lightweight") == "three"
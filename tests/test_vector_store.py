@@ -0,0 +1,131 @@
+"""Tests for idempotent ingestion and the temporary store budget in vector_store.py"""
+import hashlib
+import os
+import sys
+import uuid
+
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+import vector_store
+from chunking import CharacterChunker
+from vector_store import TemporaryVectorStoreManager, VectorStoreManager
+
+DIMENSION = 16
+
+
+class FakeEmbeddingService:
+    """Deterministic hash embeddings, counting how many texts were encoded."""
+
+    model = None
+    model_id = "fake-embeddings"
+    dimension = DIMENSION
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, priority=None):
+        self.encoded += len(texts)
+        vectors = np.array([
+            np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest()[:DIMENSION], dtype=np.uint8)
+            for text in texts
+        ], dtype=np.float32) + 1
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeEmbeddingService()
+    monkeypatch.setattr(vector_store, "get_embedding_service", lambda model_name: fake)
+    monkeypatch.setattr(vector_store, "get_embedding_cache", lambda: None)
+    return fake
+
+
+def document(label: str, chunks: int = 3) -> str:
+    """Text that CharacterChunker(100, 0) splits into exactly `chunks` chunks."""
+    return "".join(f"{label} section {i} ".ljust(100, ".") for i in range(chunks))
+
+
+def make_store(tmp_path) -> VectorStoreManager:
+    return VectorStoreManager(
+        persist_directory=str(tmp_path / "chroma"),
+        collection_name="documents",
+        chunker=CharacterChunker(chunk_size=100, chunk_overlap=0)
+    )
+
+
+def make_temporary_store(max_chunks: int) -> TemporaryVectorStoreManager:
+    # Ephemeral clients share one in-process system, so every test gets its own collection
+    return TemporaryVectorStoreManager(
+        collection_name=f"temp_{uuid.uuid4().hex}",
+        max_chunks=max_chunks,
+        max_mb=1024,
+        ttl_hours=0,
+        chunker=CharacterChunker(chunk_size=100, chunk_overlap=0)
+    )
+
+
+def test_ingest_document_is_idempotent(tmp_path, service):
+    store = make_store(tmp_path)
+    text = document("policy")
+
+    assert store.ingest_document(text, "policy_txt") == 3
+    encoded = service.encoded
+    assert store.ingest_document(text, "policy_txt") == 3
+
+    assert service.encoded == encoded
+    assert store.collection.count() == 3
+    assert store.is_indexed("policy_txt", vector_store.compute_content_hash(text))
+
+
+def test_chunk_ids_are_versioned_by_content_and_chunker(tmp_path, service):
+    store = make_store(tmp_path)
+    first, second = document("first"), document("second", chunks=2)
+
+    store.ingest_document(first, "policy_txt")
+    first_ids = set(store.get_chunk_ids("policy_txt"))
+    assert first_ids == set(store._chunk_ids(
+        "policy_txt", vector_store.compute_content_hash(first), 3, chunker_key=store.chunker_key
+    ))
+
+    # New content replaces the previous version
+    assert store.ingest_document(second, "policy_txt") == 2
+    second_ids = set(store.get_chunk_ids("policy_txt"))
+    assert len(second_ids) == 2 and not second_ids & first_ids
+
+    # Same content split with other settings is a new version too
+    store.ingest_document(second, "policy_txt", chunk_size=50)
+    rechunked_ids = set(store.get_chunk_ids("policy_txt"))
+    assert len(rechunked_ids) == 4 and not rechunked_ids & second_ids
+
+
+def test_temporary_store_evicts_least_recently_used(service):
+    store = make_temporary_store(max_chunks=7)
+    store.ingest_document(document("alpha"), "alpha_pdf")
+    store.ingest_document(document("beta"), "beta_pdf")
+    # Searching alpha makes beta the least recently used
+    store.search_many(["alpha section"], document_ids="alpha_pdf")
+
+    store.ingest_document(document("gamma"), "gamma_pdf")
+
+    assert store.has_document("alpha_pdf")
+    assert not store.has_document("beta_pdf")
+    assert store.has_document("gamma_pdf")
+    stats = store.get_store_stats()
+    assert stats["documents"] == 2
+    assert stats["chunks"] == 6
+    assert store.evictions["lru"] == 1
+
+
+def test_temporary_store_evict_documents(service):
+    store = make_temporary_store(max_chunks=100)
+    store.ingest_document(document("alpha"), "alpha_pdf")
+
+    assert store.evict_documents(["alpha_pdf", "missing_pdf"]) == 1
+    assert not store.has_document("alpha_pdf")
+    assert store.evictions["cleanup"] == 1
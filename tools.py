@@ -2,15 +2,15 @@ import os
 from pprint import pprint
 import requests
 from langchain_core.tools import tool
-from vector_store import get_vector_store
+from vector_store import get_vector_store, compute_file_hash, SearchResults
 try:
     from ddgs import DDGS
 except ImportError:
     DDGS = None
-try:
-    from docling.document_converter import DocumentConverter
-except ImportError:
-    DocumentConverter = None
+from document_loader import (
+    DocumentConverter, is_plain_text, load_document_text,
+    count_pdf_pages, iter_pdf_page_batches, STREAMING_INGEST_MIN_PAGES, INGEST_PAGES_PER_BATCH
+)
 
 # Weather Tools
 @tool
@@ -203,15 +203,78 @@ def duckduckgo_search(query: str) -> str:
 @tool
 def read_document_with_docling(file_path: str) -> str:
     """Read and parse a PDF or Text document using Docling to extract text."""
-    if not DocumentConverter:
+    if not DocumentConverter and not is_plain_text(file_path):
         return "Docling library not installed."
     try:
-        converter = DocumentConverter()
-        result = converter.convert(file_path)
-        return result.document.export_to_markdown()
+        return load_document_text(file_path, lightweight=False)
     except Exception as e:
         return f"Error reading document: {e}"
 
+def ingest_file(file_path: str, document_id: str, is_temporary: bool = True, on_progress=None) -> dict:
+    """
+    Parse a document file and ingest it into the vector store.
+    Plain-function core of ingest_document_to_vector_store, used directly by
+    background ingestion jobs. Raises on failure.
+    
+    PDFs of STREAMING_INGEST_MIN_PAGES pages or more are converted, chunked
+    and embedded in page batches, so memory stays bounded and the first
+    pages are searchable before the rest are parsed.
+    
+    Args:
+        file_path: Path to the document file (PDF or text)
+        document_id: Unique identifier for this document
+        is_temporary: If True, stores in memory (session only). If False, stores to disk.
+        on_progress: Optional callback receiving {"pages_done", "total_pages", "chunks"}
+                     after each page batch of a streamed PDF
+        
+    Returns:
+        Dict with document_id, store type, chunk count and whether existing chunks were reused
+    """
+    # Use temporary store for uploads by default, unless specified otherwise
+    vector_store = get_vector_store(is_persistent=not is_temporary)
+    store_type = "temporary (in-memory)" if is_temporary else "persistent (disk)"
+    
+    # Skip parsing entirely when this exact file version is already indexed
+    content_hash = compute_file_hash(file_path)
+    if vector_store.is_indexed(document_id, content_hash):
+        return {"document_id": document_id, "store_type": store_type, "chunks": None, "reused": True}
+    
+    page_count = count_pdf_pages(file_path)
+    if page_count and page_count >= STREAMING_INGEST_MIN_PAGES:
+        def report_batch(batches_done: int, chunks: int):
+            if on_progress:
+                pages_done = min(batches_done * INGEST_PAGES_PER_BATCH, page_count)
+                on_progress({"pages_done": pages_done, "total_pages": page_count, "chunks": chunks})
+        
+        num_chunks = vector_store.ingest_document_stream(
+            iter_pdf_page_batches(file_path, page_count, INGEST_PAGES_PER_BATCH, content_hash=content_hash),
+            document_id=document_id,
+            content_hash=content_hash,
+            metadata={"file_path": file_path},
+            on_batch=report_batch
+        )
+        return {"document_id": document_id, "store_type": store_type, "chunks": num_chunks, "reused": False}
+    
+    # First parse the document: text/markdown is read directly, other formats
+    # use the lightweight Docling pipeline (no vision models, faster processing)
+    document_text = load_document_text(file_path, lightweight=True, content_hash=content_hash)
+    
+    # Ingest into vector store
+    num_chunks = vector_store.ingest_document(
+        document_text=document_text,
+        document_id=document_id,
+        metadata={"file_path": file_path},
+        content_hash=content_hash
+    )
+    
+    return {"document_id": document_id, "store_type": store_type, "chunks": num_chunks, "reused": False}
+
+def describe_ingest_result(result: dict) -> str:
+    """Human-readable status line for an ingest_file result."""
+    if result["reused"]:
+        return f"Document '{result['document_id']}' already indexed in {result['store_type']} vector store. Reusing existing chunks."
+    return f"Successfully ingested document '{result['document_id']}' into {result['store_type']} vector store. Created {result['chunks']} chunks."
+
 @tool
 def ingest_document_to_vector_store(file_path: str, document_id: str, is_temporary: bool = True) -> str:
     """
@@ -227,60 +290,55 @@ def ingest_document_to_vector_store(file_path: str, document_id: str, is_tempora
         Status message with number of chunks created
     """
     try:
-        # First parse the document
-        if not DocumentConverter:
-            return "Docling library not installed."
-        
-        # Configure lightweight pipeline - no vision models, faster processing
-        try:
-            from docling.datamodel.base_models import InputFormat
-            from docling.datamodel.pipeline_options import PdfPipelineOptions
-            from docling.document_converter import PdfFormatOption
-            
-            pipeline_options = PdfPipelineOptions()
-            pipeline_options.do_ocr = False  # Keep OCR for text extraction
-            pipeline_options.do_table_structure = False  # Disable table detection (slow)
-            # Disable slow enrichment features
-            pipeline_options.do_picture_classification = False
-            pipeline_options.do_picture_description = False
-            pipeline_options.do_code_enrichment = False
-            pipeline_options.do_formula_enrichment = False
-            pipeline_options.generate_picture_images = False
-            
-            converter = DocumentConverter(
-                format_options={
-                    InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-                }
-            )
-        except Exception as config_error:
-            # Fallback to simple converter if advanced options fail
-            print(f"⚠️ Using simple converter due to: {config_error}")
-            converter = DocumentConverter()
-        
-        result = converter.convert(file_path)
-        document_text = result.document.export_to_markdown()
-        
-        # Ingest into vector store
-        # Use temporary store for uploads by default, unless specified otherwise
-        vector_store = get_vector_store(is_persistent=not is_temporary)
-        
-        num_chunks = vector_store.ingest_document(
-            document_text=document_text,
-            document_id=document_id,
-            metadata={"file_path": file_path},
-            chunk_size=500,
-            chunk_overlap=50
-        )
-        
-        store_type = "temporary (in-memory)" if is_temporary else "persistent (disk)"
-        return f"Successfully ingested document '{document_id}' into {store_type} vector store. Created {num_chunks} chunks."
-    
+        return describe_ingest_result(ingest_file(file_path, document_id, is_temporary))
     except Exception as e:
         return f"Document ingestion failed: {e}"
 
+def search_documents(query: str, document_id: str = "", top_k: int = 3, search_type: str = "persistent") -> SearchResults:
+    """
+    Search a vector store and return typed results.
+    Plain-function core of search_vector_store, used directly by the agent
+    nodes so they read scores from the hits instead of parsing text.
+    
+    Args:
+        query: Search query text
+        document_id: Optional specific document to search within (empty string searches all documents)
+        top_k: Number of top results to return
+        search_type: "persistent" or "temporary" (for uploaded files)
+        
+    Returns:
+        SearchResults with hits (text, score, metadata) and timings
+    """
+    vector_store = get_vector_store(is_persistent=(search_type == "persistent"))
+    # Convert empty string to None for the vector store
+    return vector_store.search(query=query, top_k=top_k, document_id=document_id or None)
+
+def search_documents_many(queries: list[str], document_id: str = "", top_k: int = 3, search_type: str = "persistent") -> list[SearchResults]:
+    """
+    Search a vector store for several queries in one batch.
+    The queries are embedded together and sent to Chroma as a single
+    multi-embedding query, instead of one encode and query per question.
+    
+    Args:
+        queries: Search query texts
+        document_id: Optional specific document to search within (empty string searches all documents)
+        top_k: Number of top results to return per query
+        search_type: "persistent" or "temporary" (for uploaded files)
+        
+    Returns:
+        One SearchResults per query, in query order
+    """
+    vector_store = get_vector_store(is_persistent=(search_type == "persistent"))
+    return vector_store.search_many(queries, top_k=top_k, document_ids=document_id or None)
+
+def render_search_results(batch: list[SearchResults]) -> str:
+    """Render the results of one or more queries for an LLM prompt."""
+    if len(batch) == 1:
+        return batch[0].to_prompt()
+    return "\n".join(f"Query: {results.query}\n{results.to_prompt()}" for results in batch)
 
 @tool
-def search_vector_store(query: str, document_id: str = "", top_k: int = 3, search_type: str = "persistent") -> str:
+def search_vector_store(query: str, document_id: str = "", top_k: int = 3, search_type: str = "persistent", extra_queries: str = "") -> str:
     """
     Search the vector store for relevant document chunks.
     
@@ -289,34 +347,17 @@ def search_vector_store(query: str, document_id: str = "", top_k: int = 3, searc
         document_id: Optional specific document to search within (empty string searches all documents)
         top_k: Number of top results to return (default: 3)
         search_type: "persistent" (default) or "temporary" (for uploaded files)
+        extra_queries: Optional additional queries, one per line, searched together with query
         
     Returns:
         Formatted search results with similarity scores
     """
     try:
-        is_persistent = (search_type == "persistent")
-        vector_store = get_vector_store(is_persistent=is_persistent)
-        
-        # Convert empty string to None for the vector store
-        doc_id = document_id if document_id else None
-        
-        results = vector_store.similarity_search(
-            query=query,
-            top_k=top_k,
-            document_id=doc_id
-        )
-        
-        if not results:
-            return f"No relevant documents found in {search_type} vector store."
-        
-        # Format results
-        output = f"{search_type.capitalize()} Vector Store Search Results:\n\n"
-        for i, (chunk_text, score, metadata) in enumerate(results, 1):
-            output += f"Result {i} (Similarity: {score:.3f}):\n"
-            output += f"{chunk_text}\n"
-            output += f"[Document: {metadata.get('document_id', 'unknown')}]\n\n"
-        
-        return output
+        queries = [query] + [line.strip() for line in extra_queries.splitlines() if line.strip()]
+        # The tool result goes straight into the LLM's context, so render it here
+        if len(queries) > 1:
+            return render_search_results(search_documents_many(queries, document_id, top_k, search_type))
+        return search_documents(query, document_id, top_k, search_type).to_prompt()
     
     except Exception as e:
         return f"Vector store search failed: {e}"
\ No newline at end of file
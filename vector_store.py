@@ -6,11 +6,269 @@ functionality with configurable score thresholds.
 """
 
 import os
-from typing import List, Tuple, Optional
+import time
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Tuple, Optional, Union
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from embeddings import DEFAULT_EMBEDDING_MODEL, QUERY_PRIORITY, DOCUMENT_PRIORITY, get_embedding_service
+from embedding_cache import get_embedding_cache
+from chunking import Chunker, CHUNKER, build_chunker
+from lexical_index import BM25Index
+
+
+def compute_content_hash(data: str | bytes) -> str:
+    """SHA-256 hex digest of document text or raw file bytes."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def compute_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file, read in blocks."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+# Max distinct normalized queries kept in the in-process query embedding cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+# Retrieval: "hybrid" fuses BM25 and vector rankings (reciprocal rank fusion), "vector" is embeddings only
+SEARCH_MODES = ("hybrid", "vector")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid").lower()
+# Candidates fetched from each ranking per requested result before fusion
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+RRF_K = 60
+# A hybrid hit containing every query term counts as a confident (exact-term) match
+# when at least one of those terms is this rare (BM25 IDF; 3.0 ~ in under 5% of chunks)
+LEXICAL_MIN_IDF = float(os.getenv("LEXICAL_MIN_IDF", "3.0"))
+# Page size when building the lexical index from an existing collection
+_LEXICAL_BUILD_BATCH = 1000
+# How often searches on the persistent store check for chunks written by another process
+LEXICAL_REFRESH_INTERVAL_S = float(os.getenv("LEXICAL_REFRESH_INTERVAL_S", "30"))
+
+# Collections use cosine distance, so scores are true cosine similarities
+COLLECTION_METADATA = {"description": "Document embeddings for RAG", "hnsw:space": "cosine"}
+# Copy existing L2-space collections into cosine space when a store opens them
+VECTOR_STORE_AUTO_MIGRATE = os.getenv("VECTOR_STORE_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+_MIGRATION_SUFFIX = "__cosine_migration"
+_MIGRATION_BATCH = 1000
+
+# Minimum best-hit score for the doc agent to answer from a store without
+# falling back to web search (calibrate with calibrate_thresholds.py).
+# Defaults keep the agent's previous cut-offs: it used 0.7 (temporary) and
+# 0.5 (persistent) on 1 / (1 + squared L2 distance), and for unit-length
+# embeddings squared L2 = 2 - 2 * cosine, i.e. cosine 0.79 and 0.5.
+SCORE_THRESHOLDS = {
+    "persistent": float(os.getenv("PERSISTENT_SCORE_THRESHOLD", "0.5")),
+    "temporary": float(os.getenv("TEMPORARY_SCORE_THRESHOLD", "0.79")),
+}
+
+# Temporary (in-memory) store budget: least recently used documents are
+# evicted beyond these limits, and any document older than the TTL
+TEMP_STORE_MAX_CHUNKS = int(os.getenv("TEMP_STORE_MAX_CHUNKS", "50000"))
+TEMP_STORE_MAX_MB = int(os.getenv("TEMP_STORE_MAX_MB", "512"))
+TEMP_STORE_DOCUMENT_TTL_HOURS = float(os.getenv("TEMP_STORE_DOCUMENT_TTL_HOURS", "24"))
+# Per-chunk overhead beyond text and vector (ids, metadata, HNSW links)
+_CHUNK_OVERHEAD_BYTES = 1024
+
+
+class QueryEmbeddingCache:
+    """Thread-safe in-process LRU cache of normalized query text to embedding."""
+    
+    def __init__(self, max_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        """
+        Initialize the query cache.
+        
+        Args:
+            max_size: Maximum number of cached queries
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Cache key of a query: lowercased with whitespace collapsed (the query itself is what gets embedded)."""
+        return " ".join(query.lower().split())
+    
+    def get(self, model_id: str, normalized_query: str) -> Optional[List[float]]:
+        """Return the cached embedding (marking it recently used), or None."""
+        key = (model_id, normalized_query)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+    
+    def put(self, model_id: str, normalized_query: str, embedding: List[float]):
+        """Cache an embedding, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        key = (model_id, normalized_query)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def get_stats(self) -> dict:
+        """Size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0
+            }
+
+
+# Shared by every store: queries embed identically regardless of collection
+_query_embedding_cache = QueryEmbeddingCache()
+
+
+def get_query_cache_stats() -> dict:
+    """Hit/miss counters of the shared query embedding cache."""
+    return _query_embedding_cache.get_stats()
+
+
+def collection_space(collection) -> str:
+    """Distance function of a Chroma collection ("l2", "cosine" or "ip")."""
+    metadata = collection.metadata or {}
+    if metadata.get("hnsw:space"):
+        return metadata["hnsw:space"]
+    configuration = getattr(collection, "configuration", None) or {}
+    return (configuration.get("hnsw") or {}).get("space") or "l2"
+
+
+def _collection_names(client) -> set:
+    # list_collections returns Collection objects (or bare names on older clients)
+    return {getattr(collection, "name", collection) for collection in client.list_collections()}
+
+
+def finish_interrupted_migration(client, collection_name: str):
+    """Recover from a migration that stopped between deleting the old collection and renaming the new one."""
+    names = _collection_names(client)
+    staging = collection_name + _MIGRATION_SUFFIX
+    if staging in names and collection_name not in names:
+        client.get_collection(name=staging).modify(name=collection_name)
+        print(f"✅ Completed interrupted cosine migration of '{collection_name}'")
+
+
+def migrate_collection_to_cosine(client, collection_name: str, batch_size: int = _MIGRATION_BATCH) -> int:
+    """
+    Rebuild a collection in cosine space, keeping its ids, embeddings, documents and metadata.
+    
+    Chroma can't change a collection's distance function, so chunks are
+    copied (no re-embedding) into a staging collection, the old collection
+    is dropped and the staging one renamed. A partial copy left by a crash
+    is discarded and redone; a crash after the drop is finished by
+    finish_interrupted_migration.
+    
+    Args:
+        client: Chroma client holding the collection
+        collection_name: Collection to migrate
+        batch_size: Chunks copied per page
+        
+    Returns:
+        Number of chunks migrated (0 if already cosine)
+    """
+    finish_interrupted_migration(client, collection_name)
+    source = client.get_collection(name=collection_name)
+    if collection_space(source) == "cosine":
+        return 0
+    
+    staging = collection_name + _MIGRATION_SUFFIX
+    if staging in _collection_names(client):
+        client.delete_collection(name=staging)
+    target = client.create_collection(name=staging, metadata=COLLECTION_METADATA)
+    
+    migrated = 0
+    while True:
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=migrated)
+        if not page['ids']:
+            break
+        target.add(
+            ids=page['ids'],
+            embeddings=page['embeddings'],
+            documents=page['documents'],
+            metadatas=page['metadatas']
+        )
+        migrated += len(page['ids'])
+    
+    client.delete_collection(name=collection_name)
+    target.modify(name=collection_name)
+    return migrated
+
+
+@dataclass
+class SearchHit:
+    """One retrieved chunk."""
+    chunk_id: str
+    text: str
+    score: float  # 0-1 cosine similarity, what thresholds compare against
+    metadata: dict
+    vector_score: Optional[float] = None  # Embedding similarity
+    lexical_score: Optional[float] = None  # BM25 query-term coverage (hybrid mode, ranking only)
+    
+    @property
+    def document_id(self) -> Optional[str]:
+        return self.metadata.get("document_id")
+
+
+@dataclass
+class SearchResults:
+    """Ranked hits of one query, with per-stage timings."""
+    query: str
+    hits: List[SearchHit] = field(default_factory=list)
+    store: str = "persistent"
+    mode: str = SEARCH_MODE
+    threshold: float = 0.0
+    timings_ms: dict = field(default_factory=dict)
+    vector_best_score: float = 0.0  # Best similarity among all vector candidates, returned or not
+    exact_match: bool = False  # A hit contains every query term, one of them rare (hybrid mode)
+    
+    def __iter__(self):
+        return iter(self.hits)
+    
+    def __len__(self) -> int:
+        return len(self.hits)
+    
+    @property
+    def best_score(self) -> float:
+        """Best similarity found for the query (0.0 when nothing matched), independent of fusion."""
+        return max(max((hit.score for hit in self.hits), default=0.0), self.vector_best_score)
+    
+    @property
+    def is_confident(self) -> bool:
+        """Whether the best similarity clears the store's score threshold, or a hit is an exact-term match."""
+        return bool(self.hits) and (self.exact_match or self.best_score >= self.threshold)
+    
+    def to_prompt(self) -> str:
+        """Render the hits as text for an LLM prompt."""
+        if not self.hits:
+            return f"No relevant documents found in {self.store} vector store."
+        output = f"{self.store.capitalize()} Vector Store Search Results:\n\n"
+        for i, hit in enumerate(self.hits, 1):
+            output += f"Result {i} (Similarity: {hit.score:.3f}):\n"
+            output += f"{hit.text}\n"
+            output += f"[Document: {hit.document_id or 'unknown'}]\n\n"
+        return output
 
 
 class VectorStoreManager:
@@ -20,8 +278,10 @@ class VectorStoreManager:
         self,
         persist_directory: str = "./chroma_db",
         collection_name: str = "documents",
-        embedding_model: str = "BAAI/bge-small-en-v1.5",
-        is_persistent: bool = True
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        is_persistent: bool = True,
+        chunker: Optional[Chunker] = None,
+        score_threshold: Optional[float] = None
     ):
         """
         Initialize Vector Store Manager.
@@ -31,6 +291,8 @@ class VectorStoreManager:
             collection_name: Name of the ChromaDB collection
             embedding_model: Sentence transformer model for embeddings
             is_persistent: Whether to use persistent storage or in-memory
+            chunker: Chunking strategy (defaults to CHUNKER, sized by the embedding model's tokenizer)
+            score_threshold: Minimum confident score (defaults to the store's SCORE_THRESHOLDS entry)
         """
         self.persist_directory = persist_directory
         self.collection_name = collection_name
@@ -54,163 +316,711 @@ class VectorStoreManager:
                 )
             )
         
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(embedding_model)
+        # Shared embedding model (loaded once per process, reused by every store);
+        # encode calls go through the micro-batching service
+        self.embedding_model_name = embedding_model
+        self.embedding_service = get_embedding_service(embedding_model)
+        self.embedding_model = self.embedding_service.model
+        self.chunker = chunker or build_chunker(CHUNKER, self.embedding_model)
+        # Settings of the default chunking, recorded with every chunk and manifest entry
+        self.chunker_key = self.chunker.settings_key()
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": "Document embeddings for RAG"}
-        )
+        # Get or create collection (cosine space; older L2 collections are migrated)
+        # (not get_or_create: passing metadata for an existing collection could rewrite its space)
+        finish_interrupted_migration(self.client, collection_name)
+        if collection_name in _collection_names(self.client):
+            self.collection = self.client.get_collection(name=collection_name)
+        else:
+            self.collection = self.client.create_collection(name=collection_name, metadata=COLLECTION_METADATA)
+        self.space = collection_space(self.collection)
+        if self.space != "cosine" and VECTOR_STORE_AUTO_MIGRATE:
+            migrated = migrate_collection_to_cosine(self.client, collection_name)
+            print(f"✅ Migrated {migrated} chunks of '{collection_name}' to cosine space")
+            self.collection = self.client.get_collection(name=collection_name)
+            self.space = collection_space(self.collection)
+        elif self.space != "cosine":
+            print(f"⚠️ Collection '{collection_name}' uses {self.space} space; run migrate_chroma_cosine.py")
+        
+        store = "persistent" if is_persistent else "temporary"
+        self.score_threshold = SCORE_THRESHOLDS[store] if score_threshold is None else score_threshold
+        
+        # BM25 index over this collection, built from it on first hybrid search
+        # and then kept in step with every write and delete
+        self.lexical_index = BM25Index()
+        self._lexical_ready = False
+        self._lexical_checked_at = 0.0
+        # Held around every collection write together with its index update
+        self._lexical_lock = threading.Lock()
+        
+        # Per-document locks so concurrent ingests of one document don't interleave
+        self._document_locks: dict[str, threading.Lock] = {}
+        self._document_locks_guard = threading.Lock()
+    
+    def _document_lock(self, document_id: str) -> threading.Lock:
+        """Get the lock serializing writes for a document."""
+        with self._document_locks_guard:
+            lock = self._document_locks.get(document_id)
+            if lock is None:
+                lock = self._document_locks[document_id] = threading.Lock()
+            return lock
     
     def chunk_text(
         self,
         text: str,
-        chunk_size: int = 500,
-        chunk_overlap: int = 50
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
     ) -> List[str]:
         """
-        Split text into overlapping chunks.
+        Split text into overlapping chunks with the configured chunker.
         
         Args:
             text: Input text to chunk
-            chunk_size: Size of each chunk in characters
-            chunk_overlap: Overlap between chunks in characters
+            chunk_size: Size of each chunk in the chunker's unit (tokens for
+                        "markdown", characters for "character"); None = chunker default
+            chunk_overlap: Overlap between chunks in the same unit
             
         Returns:
             List of text chunks
         """
-        chunks = []
-        start = 0
-        text_length = len(text)
-        
-        while start < text_length:
-            end = start + chunk_size
-            chunk = text[start:end]
-            
-            # Only add non-empty chunks
-            if chunk.strip():
-                chunks.append(chunk)
-            
-            # Move start position with overlap
-            start = end - chunk_overlap
-            
-            # Prevent infinite loop for very small texts
-            if start >= text_length:
-                break
-        
-        return chunks
+        return self.chunker.split(text, chunk_size, chunk_overlap)
     
     def ingest_document(
         self,
         document_text: str,
         document_id: str,
         metadata: Optional[dict] = None,
-        chunk_size: int = 500,
-        chunk_overlap: int = 50
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        content_hash: Optional[str] = None
     ) -> int:
         """
         Ingest document into vector store with chunking and embedding.
         
+        Idempotent per content hash and chunker settings: if the document is
+        already indexed at this hash by the same chunker nothing is re-chunked
+        or re-embedded. Otherwise the new chunks are written first and the old ones
+        deleted afterwards, so the document is never missing from search.
+        
         Args:
             document_text: Full text of the document
             document_id: Unique identifier for the document
             metadata: Optional metadata to store with document
-            chunk_size: Size of each chunk in characters
-            chunk_overlap: Overlap between chunks in characters
+            chunk_size: Chunk size in the chunker's unit (None = chunker default)
+            chunk_overlap: Overlap between chunks in the chunker's unit
+            content_hash: Hash identifying this version of the document
+                          (defaults to the SHA-256 of document_text)
             
         Returns:
-            Number of chunks created and stored
+            Number of chunks stored for the document
         """
+        if content_hash is None:
+            content_hash = compute_content_hash(document_text)
+        chunker_key = self.chunker.settings_key(chunk_size, chunk_overlap)
+        
+        with self._document_lock(document_id):
+            indexed = self._get_indexed_version(document_id)
+            if indexed and indexed["content_hash"] == content_hash and indexed["chunker"] == chunker_key:
+                return indexed["total_chunks"]
+            
+            old_ids = self.collection.get(where={"document_id": document_id}, include=[])['ids']
+            num_chunks = self._add_chunks(document_text, document_id, content_hash, metadata, chunk_size, chunk_overlap)
+            
+            # Remove the previous version only after the new one is in place
+            stale_ids = set(old_ids) - set(self._chunk_ids(document_id, content_hash, num_chunks, chunker_key=chunker_key))
+            if stale_ids:
+                self._delete_ids(list(stale_ids))
+            
+            return num_chunks
+    
+    def ingest_document_stream(
+        self,
+        text_batches: Iterable[str],
+        document_id: str,
+        content_hash: str,
+        metadata: Optional[dict] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        on_batch: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Ingest a document that arrives in pieces (e.g. batches of PDF pages).
+        
+        Each batch is chunked, embedded and written before the next one is
+        read, so memory holds one batch at a time and the first chunks are
+        searchable while later ones are still being produced. Chunks are
+        written with total_chunks=0 (incomplete) and marked complete once the
+        last batch is in; until then is_indexed() keeps reporting the previous
+        version, whose chunks are only deleted at the end.
+        
+        Args:
+            text_batches: Iterable of document text pieces, in order
+            document_id: Unique identifier for the document
+            content_hash: Hash identifying this version of the document
+            metadata: Optional metadata to store with document
+            chunk_size: Chunk size in the chunker's unit (None = chunker default)
+            chunk_overlap: Overlap between chunks in the chunker's unit
+            on_batch: Optional callback(batches_done, chunks_so_far)
+            
+        Returns:
+            Number of chunks stored for the document
+        """
+        chunker_key = self.chunker.settings_key(chunk_size, chunk_overlap)
+        with self._document_lock(document_id):
+            indexed = self._get_indexed_version(document_id)
+            if indexed and indexed["content_hash"] == content_hash and indexed["chunker"] == chunker_key:
+                return indexed["total_chunks"]
+            
+            old_ids = self.collection.get(where={"document_id": document_id}, include=[])['ids']
+            
+            num_chunks = 0
+            for batch_number, batch_text in enumerate(text_batches, start=1):
+                chunks = self.chunk_text(batch_text, chunk_size, chunk_overlap)
+                if chunks:
+                    self._write_chunks(chunks, document_id, content_hash, metadata, start_index=num_chunks, total_chunks=0, chunker_key=chunker_key)
+                    num_chunks += len(chunks)
+                if on_batch:
+                    on_batch(batch_number, num_chunks)
+            
+            # Mark the new version complete, then drop the previous one
+            new_ids = self._chunk_ids(document_id, content_hash, num_chunks, chunker_key=chunker_key)
+            if new_ids:
+                self.collection.update(
+                    ids=new_ids,
+                    metadatas=[
+                        self._chunk_metadata(document_id, content_hash, i, num_chunks, metadata, chunker_key)
+                        for i in range(num_chunks)
+                    ]
+                )
+            stale_ids = set(old_ids) - set(new_ids)
+            if stale_ids:
+                self._delete_ids(list(stale_ids))
+            
+            return num_chunks
+    
+    def _chunk_ids(self, document_id: str, content_hash: str, num_chunks: int, start_index: int = 0, chunker_key: str = "") -> List[str]:
+        """Chunk IDs for one version of a document (its content and the chunker settings that split it)."""
+        version = hashlib.sha256(f"{content_hash}:{chunker_key}".encode("utf-8")).hexdigest()[:12]
+        return [f"{document_id}_{version}_chunk_{i}" for i in range(start_index, start_index + num_chunks)]
+    
+    def _chunk_metadata(
+        self,
+        document_id: str,
+        content_hash: str,
+        chunk_index: int,
+        total_chunks: int,
+        metadata: Optional[dict],
+        chunker_key: str
+    ) -> dict:
+        """Metadata stored with one chunk (total_chunks=0 marks an incomplete version)."""
+        meta = {
+            "document_id": document_id,
+            "content_hash": content_hash,
+            "chunk_index": chunk_index,
+            "total_chunks": total_chunks,
+            "chunker": chunker_key
+        }
+        if metadata:
+            meta.update(metadata)
+        return meta
+    
+    def _add_chunks(
+        self,
+        document_text: str,
+        document_id: str,
+        content_hash: str,
+        metadata: Optional[dict],
+        chunk_size: Optional[int],
+        chunk_overlap: Optional[int]
+    ) -> int:
+        """Chunk, embed and write one version of a document. Returns chunk count."""
         # Chunk the document
         chunks = self.chunk_text(document_text, chunk_size, chunk_overlap)
         
         if not chunks:
             return 0
         
+        self._write_chunks(
+            chunks, document_id, content_hash, metadata, start_index=0, total_chunks=len(chunks),
+            chunker_key=self.chunker.settings_key(chunk_size, chunk_overlap)
+        )
+        return len(chunks)
+    
+    def _write_chunks(
+        self,
+        chunks: List[str],
+        document_id: str,
+        content_hash: str,
+        metadata: Optional[dict],
+        start_index: int,
+        total_chunks: int,
+        chunker_key: str
+    ):
+        """Embed and upsert a run of consecutive chunks of one document version."""
         # Generate embeddings
-        embeddings = self.embedding_model.encode(
-            chunks,
-            convert_to_numpy=True,
-            show_progress_bar=False
-        ).tolist()
+        embeddings = self.embed_chunks(chunks).tolist()
         
         # Prepare metadata for each chunk
-        chunk_metadata = []
-        for i in range(len(chunks)):
-            meta = {
-                "document_id": document_id,
-                "chunk_index": i,
-                "total_chunks": len(chunks)
-            }
-            if metadata:
-                meta.update(metadata)
-            chunk_metadata.append(meta)
-        
-        # Generate unique IDs for each chunk
-        chunk_ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-        
-        # Add to collection
-        self.collection.add(
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=chunk_metadata,
-            ids=chunk_ids
-        )
+        chunk_metadata = [
+            self._chunk_metadata(document_id, content_hash, start_index + i, total_chunks, metadata, chunker_key)
+            for i in range(len(chunks))
+        ]
         
-        return len(chunks)
+        # Generate unique IDs for each chunk (versioned by content hash)
+        chunk_ids = self._chunk_ids(document_id, content_hash, len(chunks), start_index, chunker_key)
+        
+        # Add to collection (and the lexical index in the same step, so the two never disagree)
+        with self._lexical_lock:
+            self.collection.upsert(
+                embeddings=embeddings,
+                documents=chunks,
+                metadatas=chunk_metadata,
+                ids=chunk_ids
+            )
+            if self._lexical_ready:
+                self.lexical_index.add(chunk_ids, chunks, [document_id] * len(chunks))
+    
+    def _delete_ids(self, ids: List[str]):
+        """Delete chunks from the collection and the lexical index."""
+        with self._lexical_lock:
+            self.collection.delete(ids=ids)
+            if self._lexical_ready:
+                self.lexical_index.remove(ids)
+    
+    def _ensure_lexical_index(self):
+        """
+        Build the lexical index on first use, then keep it current.
+        
+        This process's writes update it directly. The persistent collection
+        can also be written by another process (ingest_persistent_docs.py
+        from the CLI), so at most every LEXICAL_REFRESH_INTERVAL_S a search
+        runs refresh_lexical_index() to pick those changes up.
+        """
+        if self._lexical_ready:
+            if self.is_persistent and time.monotonic() - self._lexical_checked_at >= LEXICAL_REFRESH_INTERVAL_S:
+                self.refresh_lexical_index()
+            return
+        with self._lexical_lock:
+            if not self._lexical_ready:
+                self._build_lexical_index()
+    
+    def refresh_lexical_index(self) -> bool:
+        """
+        Rebuild the lexical index if the collection was changed by another process.
+        
+        In-process writes hold the same lock as this check, so a count
+        mismatch can only come from outside. A re-index elsewhere that
+        leaves the chunk count unchanged is not detected (restart, or call
+        clear_collection/ingest from this process, to pick it up).
+        
+        Returns:
+            True if the index was rebuilt
+        """
+        with self._lexical_lock:
+            self._lexical_checked_at = time.monotonic()
+            if self._lexical_ready and self.collection.count() == len(self.lexical_index):
+                return False
+            if self._lexical_ready:
+                print(f"🔄 Collection '{self.collection_name}' changed outside this process; rebuilding lexical index")
+            self._build_lexical_index()
+            return True
+    
+    def _build_lexical_index(self):
+        """Load every chunk of the collection into a fresh lexical index (caller holds the lock)."""
+        self.lexical_index.clear()
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=_LEXICAL_BUILD_BATCH, offset=offset)
+            if not page['ids']:
+                break
+            self.lexical_index.add(
+                page['ids'],
+                page['documents'],
+                [(meta or {}).get("document_id") for meta in page['metadatas']]
+            )
+            offset += len(page['ids'])
+        self._lexical_ready = True
+        self._lexical_checked_at = time.monotonic()
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        document_id: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> "SearchResults":
+        """
+        Search the store, returning typed hits with scores and timings.
+        
+        In hybrid mode the vector and BM25 rankings are merged with
+        reciprocal rank fusion, which only decides which chunks are returned
+        and in what order (the best vector hit is always kept). Every hit's
+        score stays its cosine similarity to the query, and confidence is
+        judged on the best similarity among all vector candidates, so hybrid
+        mode never falls back more often than vector mode. On top of that, a
+        hit containing every query term counts as confident when one of the
+        terms is rare in the collection (LEXICAL_MIN_IDF); common-word
+        overlap ("what is the policy") never does.
+        
+        Args:
+            query: Query text to search for
+            top_k: Number of top results to return
+            document_id: Optional filter by specific document ID
+            mode: "hybrid" or "vector" (defaults to SEARCH_MODE)
+            
+        Returns:
+            SearchResults, best hit first; scores are between 0 and 1
+        """
+        return self.search_many([query], top_k=top_k, document_ids=document_id, mode=mode)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        document_ids: Union[None, str, List[Optional[str]]] = None,
+        mode: Optional[str] = None
+    ) -> List["SearchResults"]:
+        """
+        Search several queries at once (compound questions, batch jobs).
+        
+        All queries are embedded in one batch, and queries sharing a
+        document filter are sent to Chroma as one multi-embedding query
+        (Chroma applies a single where filter per call, so each distinct
+        filter costs one call). Lexical ranking and fusion then run per
+        query exactly as in search(). The embed and vector timings of each
+        result are those of the shared batch.
+        
+        Args:
+            queries: Query texts
+            top_k: Number of top results per query
+            document_ids: One document ID filter (or None) for every query,
+                or a list with one filter per query
+            mode: "hybrid" or "vector" (defaults to SEARCH_MODE)
+            
+        Returns:
+            One SearchResults per query, in query order
+        """
+        mode = mode or SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Expected one of {SEARCH_MODES}")
+        if document_ids is None or isinstance(document_ids, str):
+            document_ids = [document_ids] * len(queries)
+        elif len(document_ids) != len(queries):
+            raise ValueError(f"Got {len(document_ids)} document filters for {len(queries)} queries")
+        if not queries:
+            return []
+        started = time.perf_counter()
+        
+        # Generate query embeddings in one batch (repeated questions come from the LRU cache)
+        query_embeddings = self.embed_queries(queries)
+        embed_ms = (time.perf_counter() - started) * 1000
+        
+        candidates = top_k if mode == "vector" else top_k * HYBRID_CANDIDATE_FACTOR
+        
+        # One collection query per distinct filter
+        groups: dict[Optional[str], List[int]] = defaultdict(list)
+        for i, document_id in enumerate(document_ids):
+            groups[document_id or None].append(i)
+        
+        # Vector hits with similarity scores per query, best first
+        vector_hits: List[dict[str, SearchHit]] = [{} for _ in queries]
+        vector_ms = [0.0] * len(queries)
+        for document_id, indices in groups.items():
+            step = time.perf_counter()
+            results = self.collection.query(
+                query_embeddings=[query_embeddings[i] for i in indices],
+                n_results=candidates,
+                where={"document_id": document_id} if document_id else None
+            )
+            for row, i in enumerate(indices):
+                if not (results['documents'] and results['documents'][row]):
+                    continue
+                for chunk_id, doc, distance, metadata in zip(
+                    results['ids'][row], results['documents'][row], results['distances'][row], results['metadatas'][row]
+                ):
+                    similarity_score = self._distance_to_similarity(distance)
+                    vector_hits[i][chunk_id] = SearchHit(chunk_id, doc, similarity_score, metadata or {}, vector_score=similarity_score)
+            elapsed = (time.perf_counter() - step) * 1000
+            for i in indices:
+                vector_ms[i] = elapsed
+        
+        return [
+            self._rank_hits(
+                queries[i], query_embeddings[i], vector_hits[i], top_k, document_ids[i] or None, mode,
+                {"embed_ms": embed_ms, "vector_ms": vector_ms[i]}, started
+            )
+            for i in range(len(queries))
+        ]
+    
+    def _rank_hits(
+        self,
+        query: str,
+        query_embedding: List[float],
+        vector_hits: dict,
+        top_k: int,
+        document_id: Optional[str],
+        mode: str,
+        timings: dict,
+        started: float
+    ) -> "SearchResults":
+        """Fuse one query's vector hits with its lexical ranking (hybrid mode) into SearchResults."""
+        # Confidence comes from every vector candidate, not just the hits fusion keeps
+        vector_best_score = max((hit.vector_score for hit in vector_hits.values()), default=0.0)
+        exact_match = False
+        if mode == "vector":
+            hits = list(vector_hits.values())[:top_k]
+        else:
+            candidates = top_k * HYBRID_CANDIDATE_FACTOR
+            step = time.perf_counter()
+            self._ensure_lexical_index()
+            lexical_hits = self.lexical_index.search(query, top_k=candidates, document_id=document_id)
+            coverage = {chunk_id: match for chunk_id, _, match in lexical_hits}
+            timings["lexical_ms"] = (time.perf_counter() - step) * 1000
+            
+            # Reciprocal rank fusion
+            step = time.perf_counter()
+            fused = defaultdict(float)
+            for rank, chunk_id in enumerate(vector_hits):
+                fused[chunk_id] += 1 / (RRF_K + rank + 1)
+            for rank, (chunk_id, _, _) in enumerate(lexical_hits):
+                fused[chunk_id] += 1 / (RRF_K + rank + 1)
+            top_ids = sorted(fused, key=fused.get, reverse=True)[:top_k]
+            # Keep the nearest chunk so a confident answer has its evidence in the results
+            nearest = next(iter(vector_hits), None)
+            if top_ids and nearest is not None and nearest not in top_ids:
+                top_ids[-1] = nearest
+            
+            # Lexical-only hits still need their text, metadata and vector similarity
+            missing = [chunk_id for chunk_id in top_ids if chunk_id not in vector_hits]
+            if missing:
+                fetched = self.collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+                query_vector = np.asarray(query_embedding, dtype=np.float32)
+                for chunk_id, doc, metadata, embedding in zip(
+                    fetched['ids'], fetched['documents'], fetched['metadatas'], fetched['embeddings']
+                ):
+                    distance = self._distance(query_vector, np.asarray(embedding, dtype=np.float32))
+                    similarity_score = self._distance_to_similarity(distance)
+                    vector_hits[chunk_id] = SearchHit(chunk_id, doc, similarity_score, metadata or {}, vector_score=similarity_score)
+            
+            hits = []
+            for chunk_id in top_ids:
+                hit = vector_hits.get(chunk_id)
+                if hit is None:
+                    continue  # Deleted since it was indexed
+                hit.lexical_score = coverage.get(chunk_id, 0.0)
+                hits.append(hit)
+            if any(hit.lexical_score >= 1.0 for hit in hits):
+                exact_match = bool(self.lexical_index.rare_terms(query, LEXICAL_MIN_IDF))
+            timings["fusion_ms"] = (time.perf_counter() - step) * 1000
+        
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+        return SearchResults(
+            query=query,
+            hits=hits,
+            store="persistent" if self.is_persistent else "temporary",
+            mode=mode,
+            threshold=self.score_threshold,
+            timings_ms={name: round(value, 2) for name, value in timings.items()},
+            vector_best_score=vector_best_score,
+            exact_match=exact_match
+        )
     
     def similarity_search(
         self,
         query: str,
         top_k: int = 3,
-        document_id: Optional[str] = None
+        document_id: Optional[str] = None,
+        mode: Optional[str] = None
     ) -> List[Tuple[str, float, dict]]:
         """
-        Perform similarity search on vector store.
+        Perform similarity search on vector store (tuple form of search()).
         
         Args:
             query: Query text to search for
             top_k: Number of top results to return
             document_id: Optional filter by specific document ID
+            mode: "hybrid" or "vector" (defaults to SEARCH_MODE)
             
         Returns:
             List of tuples: (chunk_text, similarity_score, metadata)
             Scores are between 0 and 1 (higher is more similar)
         """
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode(
-            [query],
-            convert_to_numpy=True,
-            show_progress_bar=False
-        ).tolist()[0]
-        
-        # Prepare where filter if document_id specified
-        where_filter = None
-        if document_id:
-            where_filter = {"document_id": document_id}
-        
-        # Query collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=where_filter
+        return [(hit.text, hit.score, hit.metadata) for hit in self.search(query, top_k, document_id, mode)]
+    
+    def similarity_search_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        document_ids: Union[None, str, List[Optional[str]]] = None,
+        mode: Optional[str] = None
+    ) -> List[List[Tuple[str, float, dict]]]:
+        """
+        Batched similarity_search: one embedding batch and one Chroma query per distinct filter.
+        
+        Args:
+            queries: Query texts
+            top_k: Number of top results per query
+            document_ids: One document ID filter (or None) for every query,
+                or a list with one filter per query
+            mode: "hybrid" or "vector" (defaults to SEARCH_MODE)
+            
+        Returns:
+            One list of (chunk_text, similarity_score, metadata) tuples per query, in query order
+        """
+        return [
+            [(hit.text, hit.score, hit.metadata) for hit in results]
+            for results in self.search_many(queries, top_k, document_ids, mode)
+        ]
+    
+    def _distance_to_similarity(self, distance: float) -> float:
+        """Convert a Chroma distance to cosine similarity, clipped to 0-1."""
+        if self.space == "l2":
+            # Squared L2 between unit vectors (the models normalize) is 2 - 2cos
+            similarity = 1 - distance / 2
+        else:
+            # cosine: 1 - cos; ip: 1 - dot (= cos for unit vectors)
+            similarity = 1 - distance
+        return max(0.0, min(1.0, similarity))
+    
+    def _distance(self, query_vector: np.ndarray, embedding: np.ndarray) -> float:
+        """Distance between two vectors in this collection's space, as Chroma computes it."""
+        if self.space == "l2":
+            return float(np.sum((embedding - query_vector) ** 2))
+        if self.space == "ip":
+            return 1 - float(np.dot(embedding, query_vector))
+        norms = float(np.linalg.norm(embedding) * np.linalg.norm(query_vector)) or 1.0
+        return 1 - float(np.dot(embedding, query_vector)) / norms
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a search query, skipping the model for recently seen queries.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Query embedding
+        """
+        return self.embed_queries([query])[0]
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed search queries, encoding the ones not in the query cache in a single batch.
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            One embedding per query, in query order
+        """
+        model_id = self.embedding_service.model_id
+        # The normalized text is only the cache key; the model sees the query as typed
+        keys = [QueryEmbeddingCache.normalize(query) for query in queries]
+        embeddings = {}
+        missing = {}  # cache key -> first query text with that key
+        for key, query in zip(keys, queries):
+            if key in embeddings or key in missing:
+                continue
+            embedding = _query_embedding_cache.get(model_id, key)
+            if embedding is None:
+                missing[key] = query
+            else:
+                embeddings[key] = embedding
+        if missing:
+            encoded = self.embedding_service.encode(list(missing.values()), priority=QUERY_PRIORITY).tolist()
+            for key, embedding in zip(missing, encoded):
+                _query_embedding_cache.put(model_id, key, embedding)
+                embeddings[key] = embedding
+        return [embeddings[key] for key in keys]
+    
+    def embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """
+        Embed document chunks, reusing cached embeddings for unchanged text.
+        
+        Only chunks missing from the persistent embedding cache are encoded;
+        their embeddings are written back to the cache.
+        
+        Args:
+            chunks: Chunk texts to embed
+            
+        Returns:
+            Array of shape (len(chunks), dimension)
+        """
+        cache = get_embedding_cache()
+        if cache is None:
+            return self.embedding_service.encode(chunks, priority=DOCUMENT_PRIORITY)
+        
+        model_id = self.embedding_service.model_id
+        cached = cache.get_many(model_id, chunks)
+        missing = [i for i in range(len(chunks)) if i not in cached]
+        
+        if missing:
+            missing_texts = [chunks[i] for i in missing]
+            encoded = self.embedding_service.encode(missing_texts, priority=DOCUMENT_PRIORITY)
+            cache.put_many(model_id, missing_texts, encoded)
+            cached.update(zip(missing, encoded))
+        
+        return np.vstack([cached[i] for i in range(len(chunks))])
+    
+    def _get_indexed_version(self, document_id: str) -> Optional[dict]:
+        """Content hash, chunker settings and chunk count of the completely indexed version of a document, if any."""
+        # Streamed versions carry total_chunks=0 until their last batch is written
+        results = self.collection.get(
+            where={"$and": [{"document_id": document_id}, {"total_chunks": {"$gt": 0}}]},
+            limit=1,
+            include=["metadatas"]
         )
+        if not results['ids']:
+            return None
+        meta = results['metadatas'][0] or {}
+        return {
+            "content_hash": meta.get("content_hash"),
+            "chunker": meta.get("chunker"),
+            "total_chunks": meta.get("total_chunks", 0)
+        }
+    
+    def is_indexed(self, document_id: str, content_hash: str) -> bool:
+        """
+        Check whether a document is already indexed at a given content hash
+        by the current chunker settings.
         
-        # Format results with similarity scores
-        formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            documents = results['documents'][0]
-            distances = results['distances'][0]
-            metadatas = results['metadatas'][0]
+        Args:
+            document_id: Document ID to look up
+            content_hash: Expected hash of the indexed version
             
-            for doc, distance, metadata in zip(documents, distances, metadatas):
-                # Convert distance to similarity score (0-1, higher is better)
-                # ChromaDB uses squared L2 distance, convert to cosine similarity approximation
-                similarity_score = 1 / (1 + distance)
-                formatted_results.append((doc, similarity_score, metadata))
+        Returns:
+            True if the stored chunks belong to that version
+        """
+        indexed = self._get_indexed_version(document_id)
+        return bool(indexed) and indexed["content_hash"] == content_hash and indexed["chunker"] == self.chunker_key
+    
+    def has_document(self, document_id: str) -> bool:
+        """
+        Check whether any chunks for a document are already stored.
+        
+        Args:
+            document_id: Document ID to look up
+            
+        Returns:
+            True if the document has at least one chunk in the collection
+        """
+        results = self.collection.get(
+            where={"document_id": document_id},
+            limit=1,
+            include=[]
+        )
+        return bool(results['ids'])
+    
+    def get_chunk_ids(self, document_id: str) -> List[str]:
+        """
+        List the IDs of all stored chunks of a document.
         
-        return formatted_results
+        Args:
+            document_id: Document ID to look up
+            
+        Returns:
+            Chunk IDs (empty if the document is not indexed)
+        """
+        return self.collection.get(where={"document_id": document_id}, include=[])['ids']
     
     def delete_document(self, document_id: str) -> int:
         """
@@ -228,7 +1038,7 @@ class VectorStoreManager:
         )
         
         if results['ids']:
-            self.collection.delete(ids=results['ids'])
+            self._delete_ids(results['ids'])
             return len(results['ids'])
         
         return 0
@@ -238,8 +1048,12 @@ class VectorStoreManager:
         self.client.delete_collection(name=self.collection_name)
         self.collection = self.client.create_collection(
             name=self.collection_name,
-            metadata={"description": "Document embeddings for RAG"}
+            metadata=COLLECTION_METADATA
         )
+        self.space = collection_space(self.collection)
+        with self._lexical_lock:
+            self.lexical_index.clear()
+            self._lexical_ready = True
     
     def get_collection_stats(self) -> dict:
         """Get statistics about the collection."""
@@ -247,13 +1061,217 @@ class VectorStoreManager:
         return {
             "total_chunks": count,
             "collection_name": self.collection_name,
-            "persist_directory": self.persist_directory
+            "persist_directory": self.persist_directory,
+            "space": self.space,
+            "score_threshold": self.score_threshold,
+            "lexical_index": self.lexical_index.get_stats() if self._lexical_ready else {"built": False}
         }
 
 
+class TemporaryVectorStoreManager(VectorStoreManager):
+    """
+    In-memory store for uploaded documents with a bounded footprint.
+    
+    Tracks each document's chunk count and estimated memory (text + vector +
+    overhead). Documents expire TEMP_STORE_DOCUMENT_TTL_HOURS after they were
+    ingested, and when the chunk or memory budget is exceeded the least
+    recently used (ingested or searched) documents are evicted first. A
+    document that is being ingested is never evicted.
+    """
+    
+    def __init__(
+        self,
+        collection_name: str = "temp_documents",
+        max_chunks: int = TEMP_STORE_MAX_CHUNKS,
+        max_mb: float = TEMP_STORE_MAX_MB,
+        ttl_hours: float = TEMP_STORE_DOCUMENT_TTL_HOURS,
+        **kwargs
+    ):
+        """
+        Initialize the temporary store.
+        
+        Args:
+            collection_name: Name of the ChromaDB collection
+            max_chunks: Maximum chunks kept across all documents
+            max_mb: Maximum estimated memory across all documents
+            ttl_hours: Lifetime of a document after ingestion (0 = no expiry)
+        """
+        super().__init__(collection_name=collection_name, is_persistent=False, **kwargs)
+        self.max_chunks = max_chunks
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_hours * 3600
+        
+        # document_id -> usage, least recently used first
+        self._usage: OrderedDict[str, dict] = OrderedDict()
+        self._usage_lock = threading.Lock()
+        self._ingesting: set[str] = set()
+        self.evictions = {"lru": 0, "ttl": 0, "cleanup": 0}
+    
+    def _chunk_bytes(self, chunks: List[str]) -> int:
+        vector_bytes = (self.embedding_service.dimension or 0) * 4
+        return sum(len(chunk.encode("utf-8")) for chunk in chunks) + len(chunks) * (vector_bytes + _CHUNK_OVERHEAD_BYTES)
+    
+    def _write_chunks(self, chunks, document_id, content_hash, metadata, start_index, total_chunks, chunker_key):
+        super()._write_chunks(chunks, document_id, content_hash, metadata, start_index, total_chunks, chunker_key)
+        now = time.time()
+        with self._usage_lock:
+            usage = self._usage.setdefault(document_id, {"chunks": 0, "bytes": 0, "ingested_at": now, "last_used": now})
+            pending = usage.setdefault("pending", {"content_hash": content_hash, "chunks": 0, "bytes": 0})
+            if pending["content_hash"] != content_hash:
+                pending.update(content_hash=content_hash, chunks=0, bytes=0)
+            pending["chunks"] += len(chunks)
+            pending["bytes"] += self._chunk_bytes(chunks)
+        # Enforce the budget as batches land, so a huge streamed upload pushes out older documents
+        self.enforce_budget()
+    
+    def _track_ingest(self, ingest, document_id: str, **kwargs) -> int:
+        """Run an ingest, keeping the document safe from eviction and recording its usage."""
+        with self._usage_lock:
+            self._ingesting.add(document_id)
+        try:
+            num_chunks = ingest(document_id=document_id, **kwargs)
+        except Exception:
+            with self._usage_lock:
+                self._ingesting.discard(document_id)
+                usage = self._usage.get(document_id)
+                pending = usage.pop("pending", None) if usage else None
+                if pending:
+                    # Chunks of the failed version stay until replaced or evicted
+                    usage["chunks"] += pending["chunks"]
+                    usage["bytes"] += pending["bytes"]
+            raise
+        
+        now = time.time()
+        with self._usage_lock:
+            self._ingesting.discard(document_id)
+            usage = self._usage.get(document_id)
+            if usage is None:
+                if not num_chunks:
+                    return num_chunks
+                # Indexed without passing through _write_chunks (tracking was reset); size unknown
+                usage = self._usage[document_id] = {"chunks": num_chunks, "bytes": 0, "ingested_at": now}
+            pending = usage.pop("pending", None)
+            if pending:
+                # The new version replaced the previous one
+                usage.update(chunks=pending["chunks"], bytes=pending["bytes"], ingested_at=now)
+            usage["last_used"] = now
+            self._usage.move_to_end(document_id)
+        self.enforce_budget()
+        return num_chunks
+    
+    def ingest_document(self, document_text: str, document_id: str, **kwargs) -> int:
+        return self._track_ingest(super().ingest_document, document_id, document_text=document_text, **kwargs)
+    
+    def ingest_document_stream(self, text_batches: Iterable[str], document_id: str, **kwargs) -> int:
+        return self._track_ingest(super().ingest_document_stream, document_id, text_batches=text_batches, **kwargs)
+    
+    def search_many(self, queries: List[str], top_k: int = 3, document_ids: Union[None, str, List[Optional[str]]] = None, mode: Optional[str] = None) -> List["SearchResults"]:
+        batch = super().search_many(queries, top_k=top_k, document_ids=document_ids, mode=mode)
+        used = set()
+        filters = document_ids if isinstance(document_ids, list) else [document_ids] * len(batch)
+        for document_id, results in zip(filters, batch):
+            used.update({document_id} if document_id else {hit.document_id for hit in results})
+        now = time.time()
+        with self._usage_lock:
+            for doc_id in used:
+                if doc_id in self._usage:
+                    self._usage[doc_id]["last_used"] = now
+                    self._usage.move_to_end(doc_id)
+        return batch
+    
+    def _evict(self, document_id: str, reason: str) -> bool:
+        """Delete a document's chunks unless it is being written. Returns True if evicted."""
+        lock = self._document_lock(document_id)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            self.delete_document(document_id)
+        finally:
+            lock.release()
+        with self._usage_lock:
+            self._usage.pop(document_id, None)
+            self.evictions[reason] += 1
+        print(f"🧹 Evicted '{document_id}' from temporary vector store ({reason})")
+        return True
+    
+    def enforce_budget(self) -> int:
+        """
+        Evict expired documents, then least recently used ones until within budget.
+        
+        Returns:
+            Number of documents evicted
+        """
+        now = time.time()
+        with self._usage_lock:
+            expired = [
+                doc_id for doc_id, usage in self._usage.items()
+                if self.ttl_seconds and now - usage["ingested_at"] > self.ttl_seconds and doc_id not in self._ingesting
+            ]
+        evicted = sum(self._evict(doc_id, "ttl") for doc_id in expired)
+        
+        while True:
+            with self._usage_lock:
+                chunks, size = self._totals()
+                if chunks <= self.max_chunks and size <= self.max_bytes:
+                    break
+                candidate = next((doc_id for doc_id in self._usage if doc_id not in self._ingesting), None)
+            if candidate is None or not self._evict(candidate, "lru"):
+                break
+            evicted += 1
+        return evicted
+    
+    def _totals(self) -> tuple[int, int]:
+        """Chunk count and estimated bytes across documents, including in-flight versions (caller holds the lock)."""
+        chunks = size = 0
+        for usage in self._usage.values():
+            chunks += usage["chunks"] + usage.get("pending", {}).get("chunks", 0)
+            size += usage["bytes"] + usage.get("pending", {}).get("bytes", 0)
+        return chunks, size
+    
+    def evict_documents(self, document_ids: Iterable[str]) -> int:
+        """
+        Remove documents whose source files were cleaned up.
+        
+        Args:
+            document_ids: Document IDs to remove
+            
+        Returns:
+            Number of documents evicted
+        """
+        evicted = 0
+        for document_id in set(document_ids):
+            with self._usage_lock:
+                tracked = document_id in self._usage
+            if (tracked or self.has_document(document_id)) and self._evict(document_id, "cleanup"):
+                evicted += 1
+        return evicted
+    
+    def clear_collection(self):
+        super().clear_collection()
+        with self._usage_lock:
+            self._usage.clear()
+    
+    def get_store_stats(self) -> dict:
+        """Budget usage and eviction counters."""
+        with self._usage_lock:
+            chunks, size = self._totals()
+            oldest = min((usage["ingested_at"] for usage in self._usage.values()), default=None)
+            return {
+                "documents": len(self._usage),
+                "chunks": chunks,
+                "max_chunks": self.max_chunks,
+                "estimated_mb": round(size / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "ttl_hours": self.ttl_seconds / 3600,
+                "oldest_document_age_s": round(time.time() - oldest, 1) if oldest else None,
+                "evictions": dict(self.evictions)
+            }
+
+
 # Global singleton instances
 _persistent_store_instance: Optional[VectorStoreManager] = None
-_temporary_store_instance: Optional[VectorStoreManager] = None
+_temporary_store_instance: Optional[TemporaryVectorStoreManager] = None
+_store_init_lock = threading.Lock()
 
 
 def get_vector_store(is_persistent: bool = True) -> VectorStoreManager:
@@ -266,14 +1284,21 @@ def get_vector_store(is_persistent: bool = True) -> VectorStoreManager:
     """
     global _persistent_store_instance, _temporary_store_instance
     
+    # Double-checked locking: concurrent first requests must not build two stores
     if is_persistent:
         if _persistent_store_instance is None:
-            _persistent_store_instance = VectorStoreManager(is_persistent=True)
+            with _store_init_lock:
+                if _persistent_store_instance is None:
+                    _persistent_store_instance = VectorStoreManager(is_persistent=True)
         return _persistent_store_instance
     else:
         if _temporary_store_instance is None:
-            _temporary_store_instance = VectorStoreManager(
-                collection_name="temp_documents", 
-                is_persistent=False
-            )
+            with _store_init_lock:
+                if _temporary_store_instance is None:
+                    _temporary_store_instance = TemporaryVectorStoreManager(collection_name="temp_documents")
         return _temporary_store_instance
+
+
+def get_loaded_temporary_store() -> Optional[TemporaryVectorStoreManager]:
+    """The temporary store if it has been created, without creating it."""
+    return _temporary_store_instance